@@ -0,0 +1,990 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# A small stand-in for the parts of bpy and mathutils used by the add-on so it
+# can be imported and measured outside of Blender. It only models what
+# Projectile needs: ID datablocks, collections, RNA properties with update
+# callbacks, registered operators and the math types. Nothing is evaluated, so
+# frame changes and keyframes are cheap and simply counted in CALLS.
+#
+# Like blender -b it runs in background mode and has no gpu module, so the
+# add-on must load without touching any drawing code.
+#
+# install() must run before the add-on is imported.
+
+import collections
+import copy
+import math
+import sys
+import types
+
+import numpy as np
+
+
+# Calls to Blender API functions that are expensive in real Blender
+CALLS = collections.Counter()
+
+
+# mathutils
+
+class Vector:
+    __slots__ = ('_v',)
+
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        self._v = [float(v) for v in values]
+
+    def __repr__(self):
+        return f"Vector({tuple(self._v)})"
+
+    def __len__(self):
+        return len(self._v)
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __getitem__(self, index):
+        return self._v[index]
+
+    def __setitem__(self, index, value):
+        self._v[index] = float(value)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self._v, dtype=dtype)
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and self._v == other._v
+
+    def _get(index):
+        return property(lambda self: self._v[index], lambda self, value: self.__setitem__(index, value))
+
+    x = _get(0)
+    y = _get(1)
+    z = _get(2)
+
+    del _get
+
+    def __add__(self, other):
+        return type(self)([a + b for a, b in zip(self._v, other)])
+
+    def __sub__(self, other):
+        return type(self)([a - b for a, b in zip(self._v, other)])
+
+    def __mul__(self, scalar):
+        return type(self)([a * scalar for a in self._v])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        return type(self)([a / scalar for a in self._v])
+
+    def __neg__(self):
+        return type(self)([-a for a in self._v])
+
+    def copy(self):
+        return type(self)(self._v)
+
+    def to_tuple(self):
+        return tuple(self._v)
+
+    def dot(self, other):
+        return sum(a * b for a, b in zip(self._v, other))
+
+    @property
+    def length(self):
+        return math.sqrt(sum(a * a for a in self._v))
+
+    def normalized(self):
+        length = self.length
+        return self.copy() if not length else self / length
+
+    def negate(self):
+        self._v = [-a for a in self._v]
+
+    def lerp(self, other, factor):
+        return type(self)([a + (b - a) * factor for a, b in zip(self._v, other)])
+
+
+class Euler(Vector):
+    __slots__ = ('order',)
+
+    def __init__(self, values=(0.0, 0.0, 0.0), order='XYZ'):
+        super().__init__(values)
+        self.order = order
+
+    def copy(self):
+        return Euler(self._v, self.order)
+
+    def to_matrix(self):
+        rotation = np.identity(3)
+        for axis in self.order:
+            rotation = _axis_rotation(axis, self._v['XYZ'.index(axis)]) @ rotation
+        return Matrix(rotation)
+
+
+def _axis_rotation(axis, angle):
+    c, s = math.cos(angle), math.sin(angle)
+    if axis == 'X':
+        return np.array(((1, 0, 0), (0, c, -s), (0, s, c)))
+    if axis == 'Y':
+        return np.array(((c, 0, s), (0, 1, 0), (-s, 0, c)))
+    return np.array(((c, -s, 0), (s, c, 0), (0, 0, 1)))
+
+
+class Quaternion(Vector):
+    __slots__ = ()
+
+    def __init__(self, values=(1.0, 0.0, 0.0, 0.0)):
+        super().__init__(values)
+
+    def to_matrix(self):
+        w, x, y, z = self._v
+        return Matrix((
+            (1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)),
+            (2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)),
+            (2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)),
+        ))
+
+
+class Matrix:
+    __slots__ = ('_m',)
+
+    def __init__(self, rows=None):
+        self._m = np.identity(4) if rows is None else np.array(rows, dtype=float)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self._m, dtype=dtype)
+
+    def __iter__(self):
+        return (Vector(row) for row in self._m)
+
+    def __getitem__(self, index):
+        return Vector(self._m[index])
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            return Matrix(self._m @ other._m)
+
+        v = np.array(list(other), dtype=float)
+        if len(v) == len(self._m) - 1:
+            return Vector(self._m[:-1, :-1] @ v + self._m[:-1, -1])
+        return Vector(self._m @ v)
+
+    def copy(self):
+        return Matrix(self._m)
+
+    def inverted(self):
+        return Matrix(np.linalg.inv(self._m))
+
+    def to_3x3(self):
+        return Matrix(self._m[:3, :3])
+
+    def to_translation(self):
+        return Vector(self._m[:3, 3])
+
+    def to_scale(self):
+        return Vector(np.linalg.norm(self._m[:3, :3], axis=0))
+
+    def to_euler(self, order='XYZ'):
+        rotation = self._m[:3, :3] / np.linalg.norm(self._m[:3, :3], axis=0)
+        y = math.asin(max(-1.0, min(1.0, -rotation[2, 0])))
+        x = math.atan2(rotation[2, 1], rotation[2, 2])
+        z = math.atan2(rotation[1, 0], rotation[0, 0])
+        return Euler((x, y, z), order)
+
+    @staticmethod
+    def Identity(size):
+        return Matrix(np.identity(size))
+
+    @staticmethod
+    def Rotation(angle, size, axis):
+        if isinstance(axis, str):
+            rotation = _axis_rotation(axis, angle)
+        else:
+            axis = np.array(list(axis), dtype=float)
+            axis /= np.linalg.norm(axis) or 1.0
+            k = np.array(((0, -axis[2], axis[1]), (axis[2], 0, -axis[0]), (-axis[1], axis[0], 0)))
+            rotation = np.identity(3) + math.sin(angle) * k + (1 - math.cos(angle)) * k @ k
+
+        matrix = np.identity(size)
+        matrix[:3, :3] = rotation
+        return Matrix(matrix)
+
+    @staticmethod
+    def LocRotScale(location, rotation, scale):
+        if isinstance(rotation, (Euler, Quaternion)):
+            rotation = rotation.to_matrix()
+
+        matrix = np.identity(4)
+        matrix[:3, :3] = np.array(rotation)[:3, :3] * np.array(list(scale))
+        matrix[:3, 3] = list(location)
+        return Matrix(matrix)
+
+
+class BVHTree:
+    """ Brute force ray casts against a list of triangles """
+
+    def __init__(self, triangles, polygons):
+        self.triangles = triangles
+        self.polygons = polygons
+
+        edge1 = triangles[:, 1] - triangles[:, 0]
+        edge2 = triangles[:, 2] - triangles[:, 0]
+        normals = np.cross(edge1, edge2)
+        self.normals = normals / np.linalg.norm(normals, axis=1)[:, np.newaxis]
+
+    @classmethod
+    def FromPolygons(cls, vertices, polygons):
+        vertices = np.array(vertices, dtype=float)
+
+        triangles = []
+        owners = []
+        for index, polygon in enumerate(polygons):
+            for i in range(1, len(polygon) - 1):
+                triangles.append(vertices[[polygon[0], polygon[i], polygon[i + 1]]])
+                owners.append(index)
+
+        return cls(np.array(triangles).reshape(-1, 3, 3), np.array(owners, dtype=int))
+
+    # Moller-Trumbore intersection with every triangle
+    def ray_cast(self, origin, direction, distance=math.inf):
+        CALLS['ray_cast'] += 1
+
+        origin = np.array(list(origin), dtype=float)
+        direction = np.array(list(direction), dtype=float)
+
+        v0 = self.triangles[:, 0]
+        edge1 = self.triangles[:, 1] - v0
+        edge2 = self.triangles[:, 2] - v0
+
+        p = np.cross(direction, edge2)
+        det = np.einsum('ij,ij->i', edge1, p)
+        valid = np.abs(det) > 1e-12
+        inv = np.divide(1.0, det, out=np.zeros_like(det), where=valid)
+
+        t_vec = origin - v0
+        u = np.einsum('ij,ij->i', t_vec, p) * inv
+        q = np.cross(t_vec, edge1)
+        v = (q @ direction) * inv
+        t = np.einsum('ij,ij->i', edge2, q) * inv
+
+        hit = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t >= 0.0) & (t <= distance)
+        if not hit.any():
+            return None, None, None, None
+
+        i = np.flatnonzero(hit)[np.argmin(t[hit])]
+        return Vector(origin + direction * t[i]), Vector(self.normals[i]), int(self.polygons[i]), float(t[i])
+
+
+# RNA properties
+
+class Property:
+    """ Deferred RNA property created by bpy.props """
+
+    def __init__(self, kind, **options):
+        self.kind = kind
+        self.options = options
+
+    def default_value(self):
+        options = self.options
+        if self.kind == 'Pointer':
+            cls = options['type']
+            return cls() if issubclass(cls, PropertyGroup) else None
+        if self.kind == 'Collection':
+            return []
+        if self.kind == 'FloatVector':
+            default = options.get('default', (0.0,) * options.get('size', 3))
+            return Euler(default) if options.get('subtype') == 'EULER' else Vector(default)
+        if self.kind == 'Enum' and 'default' not in options:
+            return options['items'][0][0]
+
+        return options.get('default', {'Bool': False, 'Int': 0, 'Float': 0.0, 'String': ""}.get(self.kind))
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        values = instance.__dict__.setdefault('_rna_values', {})
+        if self not in values:
+            values[self] = self.default_value()
+        return values[self]
+
+    def __set__(self, instance, value):
+        if self.kind == 'FloatVector':
+            value = self.default_value().__class__(value)
+        instance.__dict__.setdefault('_rna_values', {})[self] = value
+
+        update = self.options.get('update')
+        if update:
+            update(instance, bpy.context)
+
+
+def _property_function(kind):
+    return lambda **options: Property(kind, **options)
+
+
+class Struct:
+    """ Base of RNA types, also stores ID properties """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # Annotated properties become descriptors like they do on register
+        for name, annotation in cls.__dict__.get('__annotations__', {}).items():
+            if isinstance(annotation, Property):
+                setattr(cls, name, annotation)
+
+    def _id_properties(self):
+        return self.__dict__.setdefault('_id_values', {})
+
+    def __getitem__(self, key):
+        return self._id_properties()[key]
+
+    def __setitem__(self, key, value):
+        self._id_properties()[key] = value
+
+    def __delitem__(self, key):
+        del self._id_properties()[key]
+
+    def __contains__(self, key):
+        return key in self._id_properties()
+
+    def get(self, key, default=None):
+        return self._id_properties().get(key, default)
+
+    def keys(self):
+        return self._id_properties().keys()
+
+    # Shallow copy with its own RNA and ID property values
+    def _copy(self):
+        struct = copy.copy(self)
+        for storage in ('_rna_values', '_id_values'):
+            if storage in self.__dict__:
+                struct.__dict__[storage] = {
+                    key: value._copy() if isinstance(value, Struct) else copy.copy(value)
+                    for key, value in self.__dict__[storage].items()}
+        return struct
+
+
+class PropertyGroup(Struct):
+    pass
+
+
+class Operator(Struct):
+    def report(self, level, message):
+        print(f"{self.bl_idname}: {message}")
+
+
+class Panel(Struct):
+    pass
+
+
+class ID(Struct):
+    def __init__(self, name):
+        self.name = name
+
+
+class MeshVertices:
+    def __init__(self, co):
+        self.co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+
+        # Vertex normals point away from the center of the mesh
+        offsets = self.co - self.co.mean(axis=0) if len(self.co) else self.co
+        lengths = np.linalg.norm(offsets, axis=1, keepdims=True)
+        self.normal = np.divide(offsets, lengths, out=np.zeros_like(offsets), where=lengths > 0.0)
+
+    def __len__(self):
+        return len(self.co)
+
+    def foreach_get(self, attribute, out):
+        out[:] = getattr(self, attribute).ravel()
+
+
+# Every triangle is a face
+class MeshPolygons:
+    def __init__(self, co, triangles):
+        corners = np.asarray(co, dtype=np.float32).reshape(-1, 3)[triangles]
+        self.center = corners.mean(axis=1)
+
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        self.normal = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+    def __len__(self):
+        return len(self.center)
+
+    def foreach_get(self, attribute, out):
+        out[:] = getattr(self, attribute).ravel()
+
+
+class MeshLoopTriangles:
+    def __init__(self, triangles):
+        self.triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def foreach_get(self, attribute, out):
+        out[:] = self.triangles.ravel()
+
+
+class Mesh(ID):
+    def __init__(self, name, vertices=(), triangles=()):
+        super().__init__(name)
+        self.vertices = MeshVertices(vertices)
+        self.loop_triangles = MeshLoopTriangles(triangles)
+        self.polygons = MeshPolygons(vertices, self.loop_triangles.triangles)
+
+    def calc_loop_triangles(self):
+        pass
+
+
+class RigidBodyObject(Struct):
+    def __init__(self):
+        self.type = 'ACTIVE'
+        self.kinematic = False
+        self.enabled = True
+        self.collision_collections = [i == 0 for i in range(20)]
+        self.collision_shape = 'CONVEX_HULL'
+        self.mesh_source = 'DEFORM'
+        self.friction = 0.5
+        self.restitution = 0.0
+        self.mass = 1.0
+        self.linear_damping = 0.04
+        self.angular_damping = 0.1
+        self.use_deactivation = False
+        self.deactivate_linear_velocity = 0.4
+        self.deactivate_angular_velocity = 0.5
+
+
+class Modifiers(list):
+    def new(self, name, type):
+        modifier = types.SimpleNamespace(name=name, type=type, node_group=None)
+        self.append(modifier)
+        return modifier
+
+
+class Object(ID):
+    def __init__(self, name, data):
+        super().__init__(name)
+        self.data = data
+        self.type = 'EMPTY' if data is None else 'MESH'
+        self._location = Vector()
+        self._rotation_euler = Euler()
+        self._scale = Vector((1.0, 1.0, 1.0))
+        self.rotation_quaternion = Quaternion()
+        self.rotation_axis_angle = [0.0, 0.0, 1.0, 0.0]
+        self.rotation_mode = 'XYZ'
+        self.delta_location = Vector()
+        self.delta_rotation_euler = Euler()
+        self.delta_rotation_quaternion = Quaternion()
+        self.delta_scale = Vector((1.0, 1.0, 1.0))
+        self.parent = None
+        self.parent_type = 'OBJECT'
+        self.constraints = []
+        self.matrix_parent_inverse = Matrix.Identity(4)
+        self.animation_data = None
+        self.hide_viewport = False
+        self.hide_render = False
+        self.rigid_body = None
+        self.empty_display_size = 1.0
+        self.modifiers = Modifiers()
+        self.users_collection = []
+        self.selected = False
+        self.keyframes = []
+
+    def _transform(name, cls):
+        return property(lambda self: getattr(self, name), lambda self, value: setattr(self, name, cls(value)))
+
+    location = _transform('_location', Vector)
+    rotation_euler = _transform('_rotation_euler', Euler)
+    scale = _transform('_scale', Vector)
+
+    del _transform
+
+    @property
+    def matrix_basis(self):
+        return Matrix.LocRotScale(self._location, self._rotation_euler, self._scale)
+
+    @property
+    def matrix_world(self):
+        if self.parent:
+            return self.parent.matrix_world @ self.matrix_parent_inverse @ self.matrix_basis
+        return self.matrix_basis
+
+    @matrix_world.setter
+    def matrix_world(self, matrix):
+        self._location = matrix.to_translation()
+        self._rotation_euler = matrix.to_euler()
+        self._scale = matrix.to_scale()
+
+    def _local_bounds(self):
+        if self.data is None or not len(self.data.vertices):
+            return np.zeros(3), np.zeros(3)
+        return self.data.vertices.co.min(axis=0), self.data.vertices.co.max(axis=0)
+
+    @property
+    def bound_box(self):
+        low, high = self._local_bounds()
+        return [(x, y, z) for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])]
+
+    @property
+    def dimensions(self):
+        low, high = self._local_bounds()
+        return Vector((high - low) * np.abs(np.array(self._scale)))
+
+    def select_set(self, state):
+        self.selected = state
+
+    def select_get(self):
+        return self.selected
+
+    def keyframe_insert(self, data_path, index=-1, frame=None):
+        CALLS['keyframe_insert'] += 1
+        self.keyframes.append((bpy.context.scene.frame_current if frame is None else frame, data_path))
+        return True
+
+    def copy(self):
+        # Like Blender, the copy of "name.001" is named from "name"
+        base, _, suffix = self.name.rpartition(".")
+        name = bpy.data.objects.unique_name(base if base and suffix.isdigit() else self.name)
+
+        ob = self._copy()
+        ob.name = name
+        ob._location = self._location.copy()
+        ob._rotation_euler = self._rotation_euler.copy()
+        ob._scale = self._scale.copy()
+        ob.modifiers = Modifiers(self.modifiers)
+        ob.users_collection = []
+        ob.keyframes = []
+        if self.rigid_body:
+            ob.rigid_body = self.rigid_body._copy()
+            ob.rigid_body.collision_collections = list(self.rigid_body.collision_collections)
+
+        bpy.data.objects.items[name] = ob
+        return ob
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+    def to_mesh(self):
+        return self.data
+
+    def to_mesh_clear(self):
+        pass
+
+
+class CollectionObjects:
+    def __init__(self, owner):
+        self.owner = owner
+        self.objects = {}
+
+    def __iter__(self):
+        # Iterate over a copy so objects can be removed while iterating
+        return iter(list(self.objects.values()))
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __contains__(self, item):
+        name = item if isinstance(item, str) else item.name
+        return name in self.objects
+
+    def link(self, ob):
+        if ob.name in self.objects:
+            raise RuntimeError(f"Object '{ob.name}' already in collection '{self.owner.name}'")
+        self.objects[ob.name] = ob
+        ob.users_collection.append(self.owner)
+
+    def unlink(self, ob):
+        del self.objects[ob.name]
+        ob.users_collection.remove(self.owner)
+
+
+class CollectionChildren(list):
+    def link(self, collection):
+        self.append(collection)
+
+    def unlink(self, collection):
+        self.remove(collection)
+
+
+class Collection(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.objects = CollectionObjects(self)
+        self.children = CollectionChildren()
+
+    def all_objects(self):
+        objects = dict(self.objects.objects)
+        for child in self.children:
+            objects.update(child.all_objects())
+        return objects
+
+
+class IDCollection:
+    """ A bpy.data collection of datablocks with unique names """
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.items = {}
+        self.suffixes = {}
+
+    def __iter__(self):
+        return iter(list(self.items.values()))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        name = item if isinstance(item, str) else item.name
+        return name in self.items
+
+    def get(self, name, default=None):
+        return self.items.get(name, default)
+
+    def unique_name(self, name):
+        if name not in self.items:
+            return name
+
+        suffix = self.suffixes.get(name, 0)
+        while True:
+            suffix += 1
+            candidate = f"{name}.{suffix:03}"
+            if candidate not in self.items:
+                self.suffixes[name] = suffix
+                return candidate
+
+    def new(self, name, *args):
+        datablock = self.cls(self.unique_name(name), *args)
+        self.items[datablock.name] = datablock
+        return datablock
+
+    def remove(self, datablock, do_unlink=True):
+        del self.items[datablock.name]
+
+        # Unlink from any collection that still holds it
+        for collection in list(getattr(datablock, 'users_collection', ())):
+            collection.objects.unlink(datablock)
+
+
+class SceneObjects:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def __iter__(self):
+        return iter(list(self.objects.values()))
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __contains__(self, item):
+        name = item if isinstance(item, str) else item.name
+        return name in self.objects
+
+    def get(self, name, default=None):
+        return self.objects.get(name, default)
+
+
+class RigidBodyWorld:
+    def __init__(self, collection):
+        self.collection = collection
+        self.enabled = True
+        self.substeps_per_frame = 10
+        self.solver_iterations = 10
+        self.point_cache = types.SimpleNamespace(frame_start=1, frame_end=250)
+
+
+class Scene(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.collection = Collection("Scene Collection")
+        self.frame_current = 1
+        self.frame_start = 1
+        self.frame_end = 250
+        self.render = RenderSettings()
+        self.use_gravity = True
+        self.gravity = Vector((0.0, 0.0, -9.81))
+        self.rigidbody_world = None
+
+    @property
+    def objects(self):
+        return SceneObjects(self.collection.all_objects())
+
+    def frame_set(self, frame, subframe=0.0):
+        CALLS['frame_set'] += 1
+        self.frame_current = int(frame)
+
+    def ray_cast(self, depsgraph, origin, direction, distance=1.70141e+38):
+        CALLS['ray_cast'] += 1
+        return False, None, None, -1, None, None
+
+
+class RenderSettings(Struct):
+    def __init__(self):
+        self.fps = 24
+        self.fps_base = 1.0
+
+
+class Depsgraph:
+    def __init__(self):
+        self.updates = []
+
+
+class LayerObjects:
+    def __init__(self, scene):
+        self.scene = scene
+        self.active = None
+
+    def __iter__(self):
+        return iter(self.scene.objects)
+
+
+class ViewLayer:
+    def __init__(self, scene):
+        self.objects = LayerObjects(scene)
+        self.depsgraph = Depsgraph()
+
+
+class Context:
+    def __init__(self, scene):
+        self.scene = scene
+        self.view_layer = ViewLayer(scene)
+        self.screen = types.SimpleNamespace(areas=[])
+        self.window_manager = types.SimpleNamespace(windows=[])
+
+    @property
+    def object(self):
+        return self.view_layer.objects.active
+
+    @property
+    def active_object(self):
+        return self.view_layer.objects.active
+
+    @property
+    def selected_objects(self):
+        return [ob for ob in self.scene.objects if ob.selected]
+
+    def evaluated_depsgraph_get(self):
+        return self.view_layer.depsgraph
+
+
+class BlendData:
+    def __init__(self):
+        self.filepath = ""
+        self.objects = IDCollection(Object)
+        self.meshes = IDCollection(Mesh)
+        self.collections = IDCollection(Collection)
+        self.scenes = IDCollection(Scene)
+        self.node_groups = IDCollection(ID)
+
+
+# Operators
+
+OPERATORS = {}
+
+def register_class(cls):
+    idname = getattr(cls, 'bl_idname', None)
+    if idname and issubclass(cls, Operator):
+        OPERATORS[idname] = cls
+
+def unregister_class(cls):
+    OPERATORS.pop(getattr(cls, 'bl_idname', None), None)
+
+# Built in operators the add-on calls
+def rigidbody_object_add():
+    context = bpy.context
+    scene = context.scene
+    ob = context.object
+
+    if scene.rigidbody_world is None:
+        scene.rigidbody_world = RigidBodyWorld(bpy.data.collections.new("RigidBodyWorld"))
+
+    ob.rigid_body = RigidBodyObject()
+    scene.rigidbody_world.collection.objects.link(ob)
+
+    return {'FINISHED'}
+
+BUILTIN_OPERATORS = {
+    'rigidbody.object_add': rigidbody_object_add,
+}
+
+class OperatorCaller:
+    def __init__(self, idname):
+        self.idname = idname
+
+    def __call__(self, **properties):
+        CALLS[f"ops.{self.idname}"] += 1
+
+        if self.idname in OPERATORS:
+            op = OPERATORS[self.idname]()
+            for name, value in properties.items():
+                setattr(op, name, value)
+
+            if hasattr(op, 'poll') and not op.poll(bpy.context):
+                raise RuntimeError(f"Operator bpy.ops.{self.idname}.poll() failed, context is incorrect")
+
+            return op.execute(bpy.context)
+
+        return BUILTIN_OPERATORS[self.idname]()
+
+class OperatorCategory:
+    def __init__(self, category):
+        self.category = category
+
+    def __getattr__(self, name):
+        return OperatorCaller(f"{self.category}.{name}")
+
+class OperatorModule(types.ModuleType):
+    def __getattr__(self, category):
+        return OperatorCategory(category)
+
+
+class ExportHelper(Struct):
+    filepath: Property('String', subtype='FILE_PATH')
+
+
+class ImportHelper(Struct):
+    filepath: Property('String', subtype='FILE_PATH')
+
+
+def persistent(function):
+    return function
+
+class Timers:
+    def __init__(self):
+        self.functions = set()
+
+    def register(self, function, first_interval=0.0, persistent=False):
+        self.functions.add(function)
+
+    def unregister(self, function):
+        self.functions.discard(function)
+
+    def is_registered(self, function):
+        return function in self.functions
+
+class MessageBus:
+    def __init__(self):
+        self.subscriptions = []
+
+    def subscribe_rna(self, key, owner, args, notify, options=set()):
+        self.subscriptions.append((key, owner, notify))
+
+    def clear_by_owner(self, owner):
+        self.subscriptions = [s for s in self.subscriptions if s[1] is not owner]
+
+class SpaceView3D:
+    handlers = []
+
+    @staticmethod
+    def draw_handler_add(function, args, region_type, draw_type):
+        SpaceView3D.handlers.append(function)
+        return function
+
+    @staticmethod
+    def draw_handler_remove(handle, region_type):
+        SpaceView3D.handlers.remove(handle)
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+bpy = None
+
+# Create the fake modules and add them to sys.modules
+def install(version=(4, 1, 0)):
+    global bpy
+
+    if bpy is not None:
+        return bpy
+
+    handlers = _module(
+        'bpy.app.handlers',
+        persistent=persistent,
+        **{name: [] for name in ('load_post', 'depsgraph_update_post', 'frame_change_pre',
+                                 'frame_change_post', 'undo_post', 'redo_post', 'save_pre')})
+
+    app = _module(
+        'bpy.app',
+        version=version,
+        version_string=".".join(str(v) for v in version),
+        background=True,
+        binary_path="blender",
+        handlers=handlers,
+        timers=Timers())
+
+    props = _module('bpy.props', **{
+        f"{kind}Property": _property_function(kind)
+        for kind in ('Bool', 'BoolVector', 'Int', 'Float', 'FloatVector', 'Enum', 'String', 'Pointer', 'Collection')})
+
+    bpy_types = _module(
+        'bpy.types',
+        Struct=Struct, PropertyGroup=PropertyGroup, Operator=Operator, Panel=Panel, ID=ID,
+        Object=Object, Mesh=Mesh, Collection=Collection, Scene=Scene, RenderSettings=RenderSettings,
+        RigidBodyObject=RigidBodyObject, SpaceView3D=SpaceView3D)
+
+    path = _module(
+        'bpy.path',
+        abspath=lambda path: path[2:] if path.startswith("//") else path,
+        clean_name=lambda name: "".join(c if c.isalnum() or c in "-_." else "_" for c in name),
+        display_name_from_filepath=lambda path: path.rsplit("/", 1)[-1].rsplit(".", 1)[0])
+
+    utils = _module('bpy.utils', register_class=register_class, unregister_class=unregister_class)
+
+    bpy = _module(
+        'bpy', app=app, props=props, types=bpy_types, path=path, utils=utils,
+        ops=OperatorModule('bpy.ops'), msgbus=MessageBus())
+
+    bvhtree = _module('mathutils.bvhtree', BVHTree=BVHTree)
+    mathutils = _module(
+        'mathutils', Vector=Vector, Euler=Euler, Quaternion=Quaternion, Matrix=Matrix, bvhtree=bvhtree)
+
+    io_utils = _module('bpy_extras.io_utils', ExportHelper=ExportHelper, ImportHelper=ImportHelper)
+
+    sys.modules.update({
+        'bpy': bpy,
+        'bpy.app': app,
+        'bpy.app.handlers': handlers,
+        'bpy.props': props,
+        'bpy.types': bpy_types,
+        'bpy.path': path,
+        'bpy.utils': utils,
+        'bpy.ops': bpy.ops,
+        'bpy_extras': _module('bpy_extras', io_utils=io_utils),
+        'bpy_extras.io_utils': io_utils,
+        'mathutils': mathutils,
+        'mathutils.bvhtree': bvhtree,
+        'bmesh': _module('bmesh'),
+    })
+
+    new_file()
+
+    return bpy
+
+# Start over with an empty file holding a single scene
+def new_file():
+    bpy.data = BlendData()
+    scene = bpy.data.scenes.new("Scene")
+    bpy.context = Context(scene)
+    CALLS.clear()
+
+    for handler in bpy.app.handlers.load_post:
+        handler(scene)
+
+    return scene
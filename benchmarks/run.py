@@ -0,0 +1,231 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Headless benchmarks of Execute, trajectory calculation, Execute All and
+# scrubbing ghost previews on synthetic scenes, run against the bpy stand-in in
+# fakeblender.py.
+#
+#   python benchmarks/run.py [--emitters 1 100 1000] [--share] [--save results.json]
+#                            [--compare results.json] [--tolerance 0.25]
+#
+# Wall times only measure the add-on's own Python, since the stand-in does not
+# evaluate anything. The call counts are deterministic and match what real
+# Blender would be asked to do, so --compare fails on any increase in them and
+# on wall time regressions beyond the tolerance.
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import fakeblender
+
+bpy = fakeblender.install()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import projectile
+from projectile import preview
+from projectile import profiling
+from projectile import utils
+
+
+# Blender API calls reported for each benchmark, followed by the number of
+# instance objects left in the scene
+COUNTED = ('frame_set', 'keyframe_insert', 'ray_cast', 'objects')
+
+def create_mesh(name, size, z=0.0, flat=False):
+    if flat:
+        vertices = [(-size, -size, z), (size, -size, z), (size, size, z), (-size, size, z)]
+        triangles = [(0, 1, 2), (0, 2, 3)]
+    else:
+        vertices = [(x, y, h) for x in (-size, size) for y in (-size, size) for h in (-size, size)]
+        triangles = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+                     (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+
+    return bpy.data.meshes.new(name, vertices, triangles)
+
+# A ground plane with emitters spread over a grid above it, each launching
+# cubes in a different direction. Shared emitters launch the same cube object
+# and start one after another.
+def create_scene(emitter_count, instance_count, lifetime, share=False):
+    scene = fakeblender.new_file()
+    context = bpy.context
+    scene.frame_end = 120
+
+    ground = bpy.data.objects.new("Ground", create_mesh("Ground", 100.0, flat=True))
+    scene.collection.objects.link(ground)
+    context.view_layer.objects.active = ground
+    bpy.ops.rigidbody.object_add()
+    ground.rigid_body.type = 'PASSIVE'
+
+    cube = create_mesh("Cube", 0.5)
+    columns = math.ceil(math.sqrt(emitter_count))
+
+    shared = bpy.data.objects.new("Cube", cube)
+
+    for i in range(emitter_count):
+        ob = shared if share else bpy.data.objects.new(f"Cube_{i}", cube)
+
+        instances = bpy.data.collections.new(f"instances_{ob.name}")
+        utils.get_projectile_collection().children.link(instances)
+
+        empty = bpy.data.objects.new(f"emitter_{ob.name}", None)
+        empty.location = ((i % columns) * 4.0, (i // columns) * 4.0, 5.0 + i % 3)
+        scene.collection.objects.link(empty)
+
+        props = empty.projectile_props
+        props.is_emitter = True
+        props["instance_object"] = ob
+        props["instances_collection"] = instances
+
+        context.view_layer.objects.active = empty
+        props.instance_count = instance_count
+        props.lifetime = lifetime
+        if share:
+            props.start_frame = 1 + i * lifetime
+            props.end_frame = props.start_frame + instance_count
+        angle = 2.0 * math.pi * i / max(1, emitter_count)
+        props.v = (4.0 * math.cos(angle), 4.0 * math.sin(angle), 3.0)
+        props.is_dirty = True
+
+    context.view_layer.objects.active = None
+    scene.projectile_settings.share_instances = share
+    utils.invalidate_colliders()
+
+    return scene
+
+def emitters(scene):
+    return [ob for ob in scene.objects if ob.projectile_props.is_emitter]
+
+def bench_execute(scene):
+    bpy.context.view_layer.objects.active = emitters(scene)[0]
+    bpy.ops.rigidbody.projectile_execute(bake=False)
+
+def bench_trajectories(scene):
+    utils.calculate_trajectories(bpy.context, emitters(scene))
+
+def bench_execute_all(scene):
+    bpy.ops.rigidbody.projectile_execute_all()
+
+# Ghost previews for every frame, as when scrubbing the timeline
+def bench_ghosts(scene):
+    for frame in range(scene.frame_start, scene.frame_end + 1):
+        scene.frame_current = frame
+        preview.ghost_coordinates(bpy.context)
+
+BENCHMARKS = {
+    'execute': bench_execute,
+    'trajectories': bench_trajectories,
+    'execute_all': bench_execute_all,
+    'ghosts': bench_ghosts,
+}
+
+def run(names, emitter_counts, instance_count, lifetime, share, stages):
+    results = []
+
+    for count in emitter_counts:
+        for name in names:
+            scene = create_scene(count, instance_count, lifetime, share)
+
+            fakeblender.CALLS.clear()
+            profiling.PROFILER.reset()
+            profiling.PROFILER.enabled = stages
+
+            start = time.perf_counter()
+            BENCHMARKS[name](scene)
+            seconds = time.perf_counter() - start
+
+            result = {"benchmark": name, "emitters": count, "seconds": seconds}
+            fakeblender.CALLS['objects'] = sum("emitter" in ob.projectile_props for ob in scene.objects)
+            result.update({call: fakeblender.CALLS[call] for call in COUNTED})
+            if stages:
+                result["stages"] = {stage: total for stage, (total, _) in profiling.PROFILER.timers.items()}
+            results.append(result)
+
+            print_result(result)
+
+    return results
+
+def print_header():
+    print(f"{'benchmark':<14}{'emitters':>9}{'seconds':>10}" + "".join(f"{call:>17}" for call in COUNTED))
+
+def print_result(result):
+    print(f"{result['benchmark']:<14}{result['emitters']:>9}{result['seconds']:>10.3f}"
+          + "".join(f"{result[call]:>17}" for call in COUNTED))
+
+    for stage, total in sorted(result.get("stages", {}).items()):
+        print(f"{'':<14}{stage:>19}{total:>10.3f}")
+
+# Regressions against a saved run. Call counts must not grow at all, wall time
+# may grow by the tolerance.
+def compare(results, baseline, tolerance):
+    previous = {(r["benchmark"], r["emitters"]): r for r in baseline}
+
+    regressions = []
+    for result in results:
+        old = previous.get((result["benchmark"], result["emitters"]))
+        if old is None:
+            continue
+
+        label = f"{result['benchmark']} ({result['emitters']} emitters)"
+        for call in COUNTED:
+            if call in old and result[call] > old[call]:
+                regressions.append(f"{label}: {call} {old[call]} -> {result[call]}")
+
+        if result["seconds"] > old["seconds"] * (1.0 + tolerance):
+            regressions.append(f"{label}: {old['seconds']:.3f}s -> {result['seconds']:.3f}s")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Projectile outside of Blender")
+    parser.add_argument("--emitters", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--instances", type=int, default=10, help="Instances per emitter")
+    parser.add_argument("--lifetime", type=int, default=20, help="Instance lifetime in frames")
+    parser.add_argument("--share", action="store_true", help="Emitters share one instance object and pool")
+    parser.add_argument("--stages", action="store_true", help="Also report the profiler stage timers")
+    parser.add_argument("--save", help="Write the results to a JSON file")
+    parser.add_argument("--compare", help="Fail on regressions against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed wall time increase")
+    args = parser.parse_args()
+
+    projectile.register()
+
+    print_header()
+    results = run(args.benchmarks, args.emitters, args.instances, args.lifetime, args.share, args.stages)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+        for regression in regressions:
+            print(f"Regression: {regression}")
+
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,13 @@ bl_info = {
 import bpy
 from bpy.app.handlers import persistent
 
+from . import bake
+from . import cache
+from . import history
+from . import preview
+from . import profiling
 from . import props
+from . import registry
 from . import ui
 from . import ops
 from . import utils
@@ -39,30 +45,79 @@ from . import utils
 # Functions to run on file load
 @persistent
 def file_load_callback(scene):
-    props.subscribe_to_rna_props()
+    registry.EMITTERS.invalidate()
+    history.HISTORY.clear()
+
+    # Colliders and cached paths belong to the previous file
+    utils.invalidate_colliders()
 
-    # Toggle trajectory drawing if enabled in this .blend
+    if not bpy.app.background:
+        props.subscribe_to_rna_props()
+
+    # Toggle trajectory drawing and ghost previews if enabled in this .blend
     utils.toggle_trajectory_drawing()
+    utils.toggle_ghost_preview()
+
+    # A bake started for the previous file no longer applies
+    bake.cancel_bake()
+
+    # Play back the baked cache saved in this .blend
+    cache.resume_playback(bpy.context.scene)
+
+    profiling.sync(bpy.context.scene)
+
+# Functions to run after the depsgraph is updated
+@persistent
+def depsgraph_update_callback(scene, depsgraph):
+    registry.EMITTERS.depsgraph_update(scene, depsgraph)
+    utils.depsgraph_update_handler(scene, depsgraph)
+
+# Undo and redo replace every object, so no stored emitter or collider is
+# valid anymore. Recorded bakes may no longer match the restored instances.
+@persistent
+def undo_redo_callback(scene):
+    registry.EMITTERS.invalidate()
+    history.HISTORY.clear()
+    utils.invalidate_colliders()
 
 def register():
     props.register()
-    ui.register()
     ops.register()
 
-    # Add a callback for file load
+    # Add callbacks for file load and depsgraph updates
     bpy.app.handlers.load_post.append(file_load_callback)
+    bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_callback)
+    bpy.app.handlers.undo_post.append(undo_redo_callback)
+    bpy.app.handlers.redo_post.append(undo_redo_callback)
+
+    # Panels, viewport drawing and UI updates are not needed in the background
+    if bpy.app.background:
+        return
+
+    ui.register()
 
     props.subscribe_to_rna_props()
 
 def unregister():
     props.unregister()
-    ui.unregister()
     ops.unregister()
 
-    # Remove file load handler
+    # Remove file load and depsgraph handlers
     bpy.app.handlers.load_post.remove(file_load_callback)
+    bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_callback)
+    bpy.app.handlers.undo_post.remove(undo_redo_callback)
+    bpy.app.handlers.redo_post.remove(undo_redo_callback)
+
+    if not bpy.app.background:
+        ui.unregister()
+
+        props.unsubscribe_to_rna_props()
 
-    props.unsubscribe_to_rna_props()
+        # Remove the draw handlers
+        ui.PHYSICS_OT_projectle_draw.remove_handler()
+        ui.PHYSICS_OT_projectile_draw_ghosts.remove_handler()
+        preview.remove_handler()
 
-    # Remove the draw handler
-    ui.PHYSICS_OT_projectle_draw.remove_handler()
+    # Stop background bakes and cache playback
+    bake.cancel_bake()
+    cache.remove_handler()
@@ -0,0 +1,175 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import os
+import subprocess
+import tempfile
+
+import bpy
+
+from . import cache
+from . import colliders
+from . import registry
+
+
+# Seconds between checks for a finished background bake
+POLL_INTERVAL = 0.5
+
+# Frame range covering the spawns and lifetimes of every emitter in a scene
+def bake_frame_range(scene):
+    emitters = registry.EMITTERS.emitters(scene)
+    if not emitters:
+        return scene.frame_start, scene.frame_end
+
+    start = min(emitter.projectile_props.start_frame for emitter in emitters)
+
+    end = start
+    for emitter in emitters:
+        props = emitter.projectile_props
+        # Automatic lifetimes are only known once planned
+        if props.lifetime and not props.auto_lifetime:
+            end = max(end, props.end_frame + props.lifetime)
+        else:
+            end = scene.frame_end
+
+    # Other simulated objects may move before the first spawn
+    if any(ob.rigid_body.type == 'ACTIVE' for ob in colliders.collider_objects(scene)):
+        start = scene.frame_start
+
+    return start, min(end, scene.frame_end)
+
+# Only simulate the frames where projectiles exist
+def trim_point_cache(scene):
+    start, end = bake_frame_range(scene)
+
+    point_cache = scene.rigidbody_world.point_cache
+    point_cache.frame_start = start
+    point_cache.frame_end = max(start, end)
+
+# Where to store the result of a bake, next to the .blend when it is saved
+def cache_file_path(scene):
+    if bpy.data.filepath:
+        directory = os.path.join(os.path.dirname(bpy.data.filepath), "projectile_cache")
+        name = f"{bpy.path.display_name_from_filepath(bpy.data.filepath)}_{scene.name}"
+    else:
+        directory = tempfile.gettempdir()
+        name = f"projectile_{scene.name}"
+
+    os.makedirs(directory, exist_ok=True)
+
+    return os.path.join(directory, bpy.path.clean_name(name) + ".npy")
+
+
+class BakeJob:
+    """ A rigid body bake running in a background Blender process """
+
+    def __init__(self, scene):
+        self.scene_name = scene.name
+        self.cache_path = cache_file_path(scene)
+
+        # Bake a copy of the file as it is now, including unsaved changes
+        handle, self.blend_path = tempfile.mkstemp(suffix=".blend", prefix="projectile_bake_")
+        os.close(handle)
+        bpy.ops.wm.save_as_mainfile(filepath=self.blend_path, copy=True, check_existing=False)
+
+        script = os.path.join(os.path.dirname(__file__), "bake_job.py")
+        self.process = subprocess.Popen(
+            [bpy.app.binary_path, "--background", "--factory-startup", self.blend_path,
+             "--python", script, "--", self.cache_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def cancel(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.cleanup()
+
+    def cleanup(self):
+        if os.path.exists(self.blend_path):
+            os.remove(self.blend_path)
+
+    # Play back the result, or return why the bake failed
+    def finish(self):
+        self.cleanup()
+
+        scene = bpy.data.scenes.get(self.scene_name)
+        if scene is None:
+            return f"Background bake failed, scene \"{self.scene_name}\" no longer exists"
+        if self.process.returncode != 0:
+            return f"Background bake failed (exit code {self.process.returncode})"
+
+        cache.start_playback(scene, self.cache_path)
+        return None
+
+
+JOB = None
+
+# Why the last background bake failed, shown in the panel until the next bake
+ERROR = None
+
+def is_baking():
+    return JOB is not None
+
+def poll_job():
+    global JOB, ERROR
+
+    if JOB is None:
+        return None
+
+    if JOB.process.poll() is None:
+        return POLL_INTERVAL
+
+    job = JOB
+    JOB = None
+    ERROR = job.finish()
+
+    # Show the baked result or the failure
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            area.tag_redraw()
+
+    return None
+
+# Trim the point cache and simulate it in a background process. The result is
+# played back onto the open file once it is done.
+def start_bake(context):
+    global JOB
+
+    cancel_bake()
+
+    if not context.scene.rigidbody_world:
+        return
+
+    trim_point_cache(context.scene)
+
+    JOB = BakeJob(context.scene)
+    bpy.app.timers.register(poll_job, first_interval=POLL_INTERVAL)
+
+def cancel_bake():
+    global JOB, ERROR
+
+    ERROR = None
+
+    if JOB is not None:
+        JOB.cancel()
+        JOB = None
+
+    if bpy.app.timers.is_registered(poll_job):
+        bpy.app.timers.unregister(poll_job)
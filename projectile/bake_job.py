@@ -0,0 +1,54 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Simulates the rigid body world of a .blend over its point cache range and
+# writes the transforms of every simulated object to a cache file. This is run
+# in a background Blender process by the bake module:
+#
+#   blender -b file.blend --python bake_job.py -- cache.npy
+
+import importlib.util
+import os
+import sys
+
+import bpy
+
+# Load the add-on's cache module by path, so no other module named cache on
+# sys.path can be picked up instead
+spec = importlib.util.spec_from_file_location(
+    "projectile_cache", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache.py"))
+cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cache)
+
+
+def main():
+    path = sys.argv[sys.argv.index("--") + 1]
+
+    scene = bpy.context.scene
+    point_cache = scene.rigidbody_world.point_cache
+    frames = range(point_cache.frame_start, point_cache.frame_end + 1)
+
+    objects = cache.simulated_objects(scene)
+
+    records = cache.create_cache(path, frames.start, [ob.name for ob in objects], len(frames))
+    cache.record_frames(scene, objects, frames, records)
+    records.flush()
+
+
+if __name__ == "__main__":
+    main()
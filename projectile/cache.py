@@ -0,0 +1,196 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Transform caches store the world matrix and visibility of a list of objects
+# for a range of frames. The records are a (frames, objects) .npy array that
+# can be memory mapped, with a .json header next to it holding the first frame
+# and the object names.
+#
+# This module is also imported by the background bake job, so it must not use
+# relative imports.
+
+import json
+import os
+
+import bpy
+import mathutils
+import numpy as np
+
+
+CACHE_DTYPE = np.dtype([('matrix', np.float32, (4, 4)), ('visible', np.bool_)])
+
+# Transform channels muted while a cache is played back
+TRANSFORM_PATHS = {'location', 'rotation_euler', 'rotation_quaternion', 'rotation_axis_angle', 'scale'}
+
+def header_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+# Create a cache file for a number of frames of the named objects. Returns the
+# memory mapped records to fill in.
+def create_cache(path, frame_start, names, frame_count):
+    with open(header_path(path), 'w') as f:
+        json.dump({"frame_start": frame_start, "objects": names}, f)
+
+    return np.lib.format.open_memmap(path, mode='w+', dtype=CACHE_DTYPE, shape=(frame_count, len(names)))
+
+# Returns the first frame, object names and memory mapped records of a cache
+def read_cache(path):
+    with open(header_path(path)) as f:
+        header = json.load(f)
+
+    records = np.load(path, mmap_mode='r')
+
+    return header["frame_start"], header["objects"], records
+
+# Active rigid bodies whose motion comes from the simulation
+def simulated_objects(scene):
+    world = scene.rigidbody_world
+    if not world or not world.collection:
+        return []
+
+    return [ob for ob in world.collection.objects
+            if ob.rigid_body and ob.rigid_body.type == 'ACTIVE' and ob.name in scene.objects]
+
+# Record the current world matrix and visibility of each object
+def capture_frame(objects):
+    records = np.empty(len(objects), dtype=CACHE_DTYPE)
+
+    for i, ob in enumerate(objects):
+        records[i]['matrix'] = np.array(ob.matrix_world)
+        records[i]['visible'] = not ob.hide_viewport
+
+    return records
+
+# Step through frames in order (which also runs the simulation), recording the
+# objects into one row of records per frame
+def record_frames(scene, objects, frames, records):
+    for i, frame in enumerate(frames):
+        scene.frame_set(frame)
+        records[i] = capture_frame(objects)
+
+
+class Playback:
+    """ A transform cache being played back onto the objects of a scene """
+
+    def __init__(self, path, visibility):
+        self.frame_start, names, self.records = read_cache(path)
+        self.objects = [bpy.data.objects.get(name) for name in names]
+        self.visibility = visibility
+
+    def set_muted(self, mute):
+        for ob in self.objects:
+            if ob and ob.animation_data and ob.animation_data.action:
+                for fcurve in ob.animation_data.action.fcurves:
+                    if fcurve.data_path in TRANSFORM_PATHS:
+                        fcurve.mute = mute
+
+    # Remove all animation of the cached objects, the cache replaces it
+    def clear_animation(self):
+        for ob in self.objects:
+            if ob:
+                ob.animation_data_clear()
+
+    def apply(self, frame):
+        index = min(max(frame - self.frame_start, 0), len(self.records) - 1)
+        records = self.records[index]
+
+        for ob, record in zip(self.objects, records):
+            if ob is None:
+                continue
+
+            ob.matrix_world = mathutils.Matrix(record['matrix'].tolist())
+
+            if self.visibility:
+                hidden = not record['visible']
+                ob.hide_viewport = hidden
+                ob.hide_render = hidden
+
+
+PLAYBACK = None
+
+# Set the transforms of cached objects before the frame is evaluated
+def frame_change_handler(scene, depsgraph=None):
+    if PLAYBACK is not None:
+        PLAYBACK.apply(scene.frame_current)
+
+def add_handler():
+    if frame_change_handler not in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.append(frame_change_handler)
+
+def remove_handler():
+    if frame_change_handler in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(frame_change_handler)
+
+def start_playback(scene, path, visibility=False):
+    global PLAYBACK
+
+    stop_playback(scene)
+
+    settings = scene.projectile_settings
+    world = scene.rigidbody_world
+
+    # The cache replaces the simulation, so do not run it as well
+    if world:
+        settings.simulation_enabled = world.enabled
+        world.enabled = False
+
+    PLAYBACK = Playback(path, visibility)
+    PLAYBACK.set_muted(True)
+
+    settings.cache_path = path
+    settings.cache_visibility = visibility
+
+    add_handler()
+    PLAYBACK.apply(scene.frame_current)
+
+# Continue playing back the cache saved in a .blend after it is loaded
+def resume_playback(scene):
+    global PLAYBACK
+
+    PLAYBACK = None
+    remove_handler()
+
+    settings = scene.projectile_settings
+    if not settings.cache_path:
+        return
+
+    # Without the file, run the simulation again instead of playing nothing
+    path = bpy.path.abspath(settings.cache_path)
+    if not os.path.exists(path):
+        stop_playback(scene)
+        return
+
+    PLAYBACK = Playback(path, settings.cache_visibility)
+    add_handler()
+
+def stop_playback(scene):
+    global PLAYBACK
+
+    settings = scene.projectile_settings
+    if PLAYBACK is None and not settings.cache_path:
+        return
+
+    if PLAYBACK is not None:
+        PLAYBACK.set_muted(False)
+        PLAYBACK = None
+
+    if scene.rigidbody_world:
+        scene.rigidbody_world.enabled = settings.simulation_enabled
+
+    settings.cache_path = ""
+    remove_handler()
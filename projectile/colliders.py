@@ -0,0 +1,356 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import bisect
+
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+import numpy as np
+
+from . import profiling
+
+
+# Collider shapes intersected in closed form rather than ray cast
+PRIMITIVE_SHAPES = {'PLANE', 'BOX', 'SPHERE'}
+
+# Distance, relative to the size of a mesh, within which vertices are on the
+# faces of a box when detecting shapes
+BOX_TOLERANCE = 1e-4
+
+# Relative deviation of vertex distances from the radius of a detected sphere
+SPHERE_TOLERANCE = 0.02
+
+
+# Rigid bodies in the scene that projectiles can collide with
+def collider_objects(scene):
+    world = scene.rigidbody_world
+    if not world or not world.collection:
+        return []
+
+    colliders = []
+    for ob in world.collection.objects:
+        if ob.type != 'MESH':
+            continue
+
+        # Skip emitters and projectile instances
+        props = ob.projectile_props
+        if props.is_emitter or "emitter" in props:
+            continue
+
+        # Instance objects are only linked to the rigid body world collection
+        if all(collection == world.collection for collection in ob.users_collection):
+            continue
+
+        colliders.append(ob)
+
+    return colliders
+
+# Local space vertices, triangles and world matrix of an evaluated mesh object
+def local_mesh_data(ob, depsgraph):
+    ob_eval = ob.evaluated_get(depsgraph)
+    mesh = ob_eval.to_mesh()
+    mesh.calc_loop_triangles()
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', vertices)
+    vertices = vertices.reshape(-1, 3).astype(np.float64)
+
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+    triangles = triangles.reshape(-1, 3)
+
+    matrix = np.array(ob_eval.matrix_world)
+
+    ob_eval.to_mesh_clear()
+
+    return vertices, triangles, matrix
+
+# Whether the triangles of a mesh exactly cover the faces of its bounding box.
+# A flat mesh covers both sides of the box with the same triangles.
+def covers_box(vertices, triangles, low, high, tolerance):
+    corners = vertices[triangles]
+    areas = 0.5 * np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1)
+    extent = high - low
+
+    covered = np.zeros(len(triangles), dtype=bool)
+    for axis in range(3):
+        face_area = np.prod(np.delete(extent, axis))
+        for bound in (low[axis], high[axis]):
+            on_face = np.all(np.abs(corners[:, :, axis] - bound) <= tolerance, axis=1)
+            if not np.isclose(areas[on_face].sum(), face_area, rtol=1e-3, atol=tolerance * tolerance):
+                return False
+            covered |= on_face
+
+    return bool(covered.all())
+
+# Detect a plane, box or sphere from local space mesh data. Returns the shape
+# and its local bounds (the center and radius of spheres), or None.
+def detect_shape(vertices, triangles):
+    low = vertices.min(axis=0)
+    high = vertices.max(axis=0)
+    extent = high - low
+    size = extent.max()
+    if size == 0.0:
+        return None
+
+    tolerance = size * BOX_TOLERANCE
+    if covers_box(vertices, triangles, low, high, tolerance):
+        return ('PLANE' if extent.min() <= tolerance else 'BOX'), low, high
+
+    center = (low + high) / 2.0
+    distances = np.linalg.norm(vertices - center, axis=1)
+    radius = distances.mean()
+    if (len(vertices) >= 12 and np.all(np.abs(distances - radius) <= radius * SPHERE_TOLERANCE)
+            and np.allclose(extent, size, rtol=SPHERE_TOLERANCE)):
+        return 'SPHERE', center, radius
+
+    return None
+
+# Shape of a collider fitted to its bounding box when set by the user
+def fit_shape(shape, vertices):
+    low = vertices.min(axis=0)
+    high = vertices.max(axis=0)
+
+    if shape == 'SPHERE':
+        return shape, (low + high) / 2.0, (high - low).max() / 2.0
+
+    if shape == 'PLANE':
+        # Flatten the thinnest axis
+        axis = np.argmin(high - low)
+        low[axis] = high[axis] = (low[axis] + high[axis]) / 2.0
+
+    return shape, low, high
+
+# First segment (start and end point rows) entering an axis aligned box, using
+# the slab method. Returns the segment, fraction along it and the normal, or None.
+def box_hit(starts, ends, low, high):
+    direction = ends - starts
+    parallel = direction == 0.0
+    inside = (starts >= low) & (starts <= high)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_low = (low - starts) / direction
+        t_high = (high - starts) / direction
+
+    near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t_low, t_high))
+    far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t_low, t_high))
+
+    enter = near.max(axis=1)
+    hits = np.flatnonzero((enter <= far.min(axis=1)) & (enter >= 0.0) & (enter <= 1.0))
+    if not len(hits):
+        return None
+
+    segment = hits[0]
+    axis = near[segment].argmax()
+    normal = np.zeros(3)
+    normal[axis] = -np.sign(direction[segment, axis])
+
+    return segment, enter[segment], normal
+
+# First segment entering a sphere. Returns the segment, fraction along it and
+# the normal, or None.
+def sphere_hit(starts, ends, center, radius):
+    direction = ends - starts
+    offset = starts - center
+
+    a = np.einsum('ij,ij->i', direction, direction)
+    b = np.einsum('ij,ij->i', offset, direction)
+    c = np.einsum('ij,ij->i', offset, offset) - radius * radius
+    discriminant = b * b - a * c
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (-b - np.sqrt(np.maximum(discriminant, 0.0))) / a
+
+    # Paths starting inside the sphere do not hit it
+    hits = np.flatnonzero((c > 0.0) & (discriminant >= 0.0) & (a > 0.0) & (t >= 0.0) & (t <= 1.0))
+    if not len(hits):
+        return None
+
+    segment = hits[0]
+    normal = offset[segment] + direction[segment] * t[segment]
+
+    return segment, t[segment], normal
+
+
+class Primitive:
+    """ A plane, box or sphere collider in the local space of its object """
+
+    def __init__(self, ob, shape, matrix, low, high):
+        self.ob = ob
+        self.shape = shape
+        self.matrix = matrix
+        self.inverse = np.linalg.inv(matrix)
+
+        # Corners of the box, or center and radius of the sphere
+        self.low = low
+        self.high = high
+
+    # First segment of a world space path (one point per row) that enters the
+    # primitive. Returns the segment, fraction along it, world location and
+    # world normal, or None.
+    def intersect(self, path):
+        local = path @ self.inverse[:3, :3].T + self.inverse[:3, 3]
+
+        if self.shape == 'SPHERE':
+            hit = sphere_hit(local[:-1], local[1:], self.low, self.high)
+        else:
+            hit = box_hit(local[:-1], local[1:], self.low, self.high)
+
+        if hit is None:
+            return None
+
+        segment, fraction, normal = hit
+        location = path[segment] + (path[segment + 1] - path[segment]) * fraction
+
+        # Normals transform by the inverse transpose
+        normal = normal @ self.inverse[:3, :3]
+
+        return segment, fraction, location, normal / np.linalg.norm(normal)
+
+# Analytic primitive for a collider, or None if it must be ray cast
+def collider_primitive(ob, vertices, triangles, matrix):
+    shape = ob.projectile_props.collider_shape
+    if shape == 'MESH' or abs(np.linalg.det(matrix[:3, :3])) < 1e-12:
+        return None
+
+    fitted = fit_shape(shape, vertices) if shape in PRIMITIVE_SHAPES else detect_shape(vertices, triangles)
+    if fitted is None:
+        return None
+
+    return Primitive(ob, fitted[0], matrix, fitted[1], fitted[2])
+
+
+class ColliderCache:
+    """ Primitive colliders and a single world space BVH tree of the rest, rebuilt lazily """
+
+    def __init__(self):
+        self.primitives = []
+        self.tree = None
+        self.owners = []
+        self.offsets = []
+        self.valid = False
+
+    def invalidate(self):
+        self.primitives = []
+        self.tree = None
+        self.owners = []
+        self.offsets = []
+        self.valid = False
+
+    def build(self, context):
+        depsgraph = context.evaluated_depsgraph_get()
+
+        vertices = []
+        triangles = []
+        vertex_count = 0
+        triangle_count = 0
+        self.primitives = []
+        self.owners = []
+        self.offsets = []
+
+        for ob in collider_objects(context.scene):
+            co, tris, matrix = local_mesh_data(ob, depsgraph)
+            if not len(tris):
+                continue
+
+            primitive = collider_primitive(ob, co, tris, matrix)
+            if primitive:
+                self.primitives.append(primitive)
+                continue
+
+            co = co @ matrix[:3, :3].T + matrix[:3, 3]
+
+            # Remember which object owns each range of triangles
+            self.owners.append(ob)
+            self.offsets.append(triangle_count)
+
+            vertices.append(co)
+            triangles.append(tris + vertex_count)
+
+            vertex_count += len(co)
+            triangle_count += len(tris)
+
+        self.tree = None
+        if vertices:
+            self.tree = BVHTree.FromPolygons(np.concatenate(vertices).tolist(), np.concatenate(triangles).tolist())
+
+        self.valid = True
+
+    def get_tree(self, context):
+        if not self.valid:
+            with profiling.PROFILER.stage('colliders'):
+                self.build(context)
+        return self.tree
+
+    # Raycast from origin to destination against the mesh colliders. Returns a
+    # tuple matching the layout of scene.ray_cast:
+    # (result, location, normal, index, object, matrix)
+    def ray_cast(self, context, origin, destination):
+        tree = self.get_tree(context)
+        profiling.PROFILER.count('ray_cast')
+
+        direction = destination - origin
+        distance = direction.length
+        if tree is None or distance == 0.0:
+            return False, None, None, -1, None, None
+
+        location, normal, index, _ = tree.ray_cast(origin, direction / distance, distance)
+        if location is None:
+            return False, None, None, -1, None, None
+
+        ob = self.owners[bisect.bisect_right(self.offsets, index) - 1]
+
+        return True, location, normal, index, ob, ob.matrix_world
+
+    # First segment of a path (one point per frame, as vectors or array rows)
+    # that hits a collider. Primitives are intersected with every segment at
+    # once, and meshes are only ray cast up to the first primitive hit. Returns
+    # the index of the segment and a cast in the layout of ray_cast, or None.
+    def find_impact(self, context, points):
+        tree = self.get_tree(context)
+        path = np.asarray(points, dtype=np.float64)
+
+        first = None
+        for primitive in self.primitives:
+            profiling.PROFILER.count('primitive_hit_test')
+            hit = primitive.intersect(path)
+            if hit and (first is None or hit[:2] < first[:2]):
+                first = hit + (primitive.ob,)
+
+        last = first[0] if first else len(points) - 2
+        if tree is not None:
+            for i in range(last + 1):
+                origin = Vector(path[i].tolist())
+                cast = self.ray_cast(context, origin, Vector(path[i + 1].tolist()))
+                if not cast[0]:
+                    continue
+
+                segment = np.linalg.norm(path[i + 1] - path[i])
+                fraction = (cast[1] - origin).length / segment if segment else 0.0
+                if first is None or (i, fraction) < first[:2]:
+                    return i, cast
+                break
+
+        if first is None:
+            return None
+
+        segment, _, location, normal, ob = first
+        return int(segment), (True, Vector(location.tolist()), Vector(normal.tolist()), -1, ob, ob.matrix_world)
+
+
+COLLIDERS = ColliderCache()
@@ -0,0 +1,74 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Viewport drawing. This module is only imported once something is drawn so
+# the add-on loads without a GPU (e.g. blender -b).
+
+import bpy
+import gpu
+from gpu_extras.batch import batch_for_shader
+
+from . import preview
+from . import utils
+
+
+# Color of ghost previews of planned instances
+GHOST_COLOR = (0.4, 0.8, 1.0, 0.5)
+
+# Built in shader for trajectory lines, created on first draw
+SHADER = None
+
+def get_shader():
+    global SHADER
+
+    if SHADER is None:
+        name = 'UNIFORM_COLOR' if bpy.app.version[0] >= 4 else '3D_UNIFORM_COLOR'
+        SHADER = gpu.shader.from_builtin(name)
+
+    return SHADER
+
+# Draws trajectories from all emitters
+def draw_trajectory():
+    coordinates = utils.trajectory_coordinates(bpy.context)
+    if not len(coordinates):
+        return
+
+    # Draw all trajectories
+    shader = get_shader()
+    batch = batch_for_shader(shader, 'LINES', {"pos": coordinates})
+
+    shader.bind()
+    shader.uniform_float("color", (1, 1, 1, 1))
+
+    batch.draw(shader)
+
+# Draws the bounding boxes of planned instances on the current frame
+def draw_ghosts():
+    coordinates = preview.ghost_coordinates(bpy.context)
+    if not len(coordinates):
+        return
+
+    shader = get_shader()
+    batch = batch_for_shader(shader, 'LINES', {"pos": coordinates})
+
+    shader.bind()
+    shader.uniform_float("color", GHOST_COLOR)
+
+    gpu.state.blend_set('ALPHA')
+    batch.draw(shader)
+    gpu.state.blend_set('NONE')
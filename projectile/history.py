@@ -0,0 +1,81 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Bakes remembered for each emitter, including the current one
+HISTORY_LENGTH = 8
+
+
+class BakeRecord:
+    """ The emitter settings and spawn plan of one bake """
+
+    def __init__(self, properties, spawn_plan):
+        self.properties = properties
+        self.plan = spawn_plan
+
+
+# Stored values of the emitter properties. These are set back directly so the
+# update callbacks do not convert the velocity again or mark the emitter dirty.
+def snapshot_properties(props):
+    values = {}
+    for key in props.keys():
+        value = props[key]
+        values[key] = value.to_list() if hasattr(value, 'to_list') else value
+
+    return values
+
+def restore_properties(props, values):
+    for key in list(props.keys()):
+        if key not in values:
+            del props[key]
+
+    for key, value in values.items():
+        props[key] = value
+
+
+class BakeHistory:
+    """ Recent bakes of each emitter, restored by Previous Bake """
+
+    def __init__(self):
+        # Emitter name to its records, oldest first
+        self.emitters = {}
+
+    def clear(self):
+        self.emitters.clear()
+
+    def record(self, emitter, spawn_plan):
+        records = self.emitters.setdefault(emitter.name, [])
+        records.append(BakeRecord(snapshot_properties(emitter.projectile_props), spawn_plan))
+        del records[:-HISTORY_LENGTH]
+
+    def can_undo(self, emitter):
+        return len(self.emitters.get(emitter.name, ())) > 1
+
+    # Forget the current bake and return the one before it
+    def undo(self, emitter):
+        records = self.emitters.get(emitter.name)
+        if not records or len(records) < 2:
+            return None
+
+        records.pop()
+        return records[-1]
+
+    def forget(self, emitter):
+        self.emitters.pop(emitter.name, None)
+
+
+HISTORY = BakeHistory()
@@ -17,7 +17,17 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+import math
+import os
+
+from . import bake
+from . import cache
+from . import history
+from . import plan
+from . import profiling
+from . import proxies
+from . import registry
 from . import utils
 from . import ui
 
@@ -52,7 +62,7 @@ class PHYSICS_OT_projectile_add(bpy.types.Operator):
         object_collection = get_object_collection(ob)
 
         # Set object as rigid body
-        bpy.ops.rigidbody.object_add()
+        rigidbody_object_add()
 
         # Get parent instance collection
         projectile_collection = utils.get_projectile_collection()
@@ -67,6 +77,7 @@ class PHYSICS_OT_projectile_add(bpy.types.Operator):
 
         # Add empty to collection the object was in
         object_collection.objects.link(empty)
+        registry.EMITTERS.add(context.scene, empty)
 
         # Set instance object and collection
         self.set_instance_object(empty, ob)
@@ -80,12 +91,16 @@ class PHYSICS_OT_projectile_add(bpy.types.Operator):
         empty.select_set(True)
         ob.select_set(False)
 
-        # Run the operator
-        bpy.ops.rigidbody.projectile_execute()
+        bake_emitter(context, empty, utils.allocate_collision_layers(context.scene))
 
         # Ensure quality is set
         utils.set_quality(context)
 
+        push_undo(context, "New Emitter")
+
+        if context.scene.projectile_settings.background_bake:
+            bake.start_bake(context)
+
         return {'FINISHED'}
 
 
@@ -99,6 +114,17 @@ def get_instances_collection(ob):
         return ob.projectile_props["instances_collection"]
     return None
 
+# Instances collections of the emitters in a scene that hold any instances.
+# Shared instances are all kept in the collection of one emitter.
+def instance_collections(scene):
+    collections = dict.fromkeys(get_instances_collection(emitter) for emitter in registry.EMITTERS.emitters(scene))
+    return [collection for collection in collections if collection and len(collection.objects)]
+
+# Projectile instances in a scene, found without scanning every object
+def instance_objects(scene):
+    return [ob for collection in instance_collections(scene) for ob in collection.objects
+            if "emitter" in ob.projectile_props]
+
 class PHYSICS_OT_projectile_remove(bpy.types.Operator):
     bl_idname = "rigidbody.projectile_remove_emitter"
     bl_label = "Remove Emitter"
@@ -121,6 +147,14 @@ class PHYSICS_OT_projectile_remove(bpy.types.Operator):
         bpy.data.collections.remove(collection)
 
         # Remove empty
+        registry.EMITTERS.remove(context.scene, empty)
+        history.HISTORY.forget(empty)
+
+        # Instances shared with other emitters were removed with the collection
+        if context.scene.projectile_settings.share_instances:
+            for emitter in registry.EMITTERS.emitters(context.scene):
+                if emitter != empty and get_instance_object(emitter) == ob:
+                    emitter.projectile_props.is_dirty = True
         bpy.data.objects.remove(empty, do_unlink=True)
 
         # Add object to collection that empty was just removed from
@@ -137,229 +171,479 @@ class PHYSICS_OT_projectile_remove(bpy.types.Operator):
         return {'FINISHED'}
 
 
-def change_frame(context, offset):
-    new_frame = context.scene.frame_current + offset
-    context.scene.frame_set(new_frame)
+def keyframe_insert(ob, data_path, frame):
+    profiling.PROFILER.count('keyframe_insert')
+    ob.keyframe_insert(data_path, frame=frame)
+
+def rigidbody_object_add():
+    profiling.PROFILER.count('rigidbody.object_add')
+    bpy.ops.rigidbody.object_add()
+
+def set_active(ob, active, layers, frame):
+    if active:
+        ob.rigid_body.kinematic = False
+    else:
+        layers = [utils.KINEMATIC_LAYER]
+        ob.rigid_body.kinematic = True
+
+    ob.rigid_body.collision_collections = [i in layers for i in range(utils.COLLISION_LAYERS)]
+
+    keyframe_insert(ob, 'rigid_body.kinematic', frame)
+    keyframe_insert(ob, 'rigid_body.collision_collections', frame)
+
+def set_visible(ob, visible, frame):
+    ob.hide_viewport = not visible
+    ob.hide_render = not visible
+
+    keyframe_insert(ob, 'hide_viewport', frame)
+    keyframe_insert(ob, 'hide_render', frame)
+
+# Keyframe a planned spawn onto its instance object. The instance is animated
+# for two frames to give Bullet its velocity, then becomes dynamic.
+def launch_instance(ob, spawn_plan, row, layers):
+    frame = int(spawn_plan.start_frame[row])
+
+    set_visible(ob, True, frame)
+    if spawn_plan.start_hidden:
+        set_visible(ob, False, frame - 1)
+
+    # Set start keyframe
+    ob.location = spawn_plan.location[row].tolist()
+    ob.rotation_euler = spawn_plan.rotation[row].tolist()
+    keyframe_insert(ob, 'location', frame)
+    keyframe_insert(ob, 'rotation_euler', frame)
+
+    # Set end keyframe
+    ob.location = spawn_plan.launch_location[row].tolist()
+    ob.rotation_euler = spawn_plan.launch_rotation[row].tolist()
+    keyframe_insert(ob, 'location', frame + 2)
+    keyframe_insert(ob, 'rotation_euler', frame + 2)
 
-class Instance:
-    """ A projectile instance """
+    # Set animated checkbox
+    set_active(ob, False, layers, frame + 2)
 
-    def __str__(self):
-        return f"{self.ob.name} start:{self.start_frame} end:{self.end_frame}"
+    # Set unanimated checkbox
+    set_active(ob, True, layers, frame + 3)
 
-    def __init__(self, ob, emitter):
-        props = emitter.projectile_props
+# Hide an instance after its spawn ends so the object can be used again
+def expire_instance(ob, spawn_plan, row, layers):
+    frame = int(spawn_plan.end_frame[row])
 
-        self.ob = ob
-        self.lifetime = props.lifetime
-        self.v = props.v.copy()
-        self.w = props.w.copy()
+    set_active(ob, True, layers, frame)
+    set_visible(ob, True, frame)
 
-        self.emitter = emitter
+    set_active(ob, False, layers, frame + 1)
+    set_visible(ob, False, frame + 1)
 
-    # Set beginning location, rotation, and other properties
-    def initialize(self, start_frame):
-        self.start_hidden = self.emitter.projectile_props.start_hidden
-        self.start_frame = start_frame
-        self.end_frame = start_frame + self.lifetime
+def create_instance(ob, collection, empty):
+    PADDING = 4
 
-        self.velocity = self.get_emitter_velocity(bpy.context, start_frame) + self.v
+    projectile_props = empty.projectile_props
+
+    # Share one simplified mesh between all instances for collisions
+    proxy = None
+    if projectile_props.use_collision_proxy and projectile_props.collision_shape in proxies.PROXY_SHAPES:
+        proxy = proxies.get_collision_proxy(ob, projectile_props.proxy_detail)
+
+    name = f"{ob.name}_instance"
+    instance = bpy.data.objects.new(name, proxy or ob.data)
+
+    # Store a link to the emitter in the instance
+    instance.projectile_props["emitter"] = empty
+
+    collection.objects.link(instance)
+
+    bpy.context.view_layer.objects.active = instance
+    rigidbody_object_add()
+
+    instance.rigid_body.friction = projectile_props.friction
+    instance.rigid_body.restitution = projectile_props.bounciness
+    instance.rigid_body.collision_shape = projectile_props.collision_shape
+
+    if proxy:
+        proxies.use_collision_proxy(instance, ob)
+
+    # Let instances sleep once they come to rest
+    if projectile_props.use_deactivation:
+        instance.rigid_body.use_deactivation = True
+        instance.rigid_body.deactivate_linear_velocity = projectile_props.deactivate_linear_velocity
+        instance.rigid_body.deactivate_angular_velocity = projectile_props.deactivate_angular_velocity
+
+    # Bullet only supports linear damping, which decays velocity by
+    # (1 - damping) each second, matching the linear drag model
+    if projectile_props.use_drag:
+        instance.rigid_body.linear_damping = 1.0 - math.exp(-projectile_props.linear_drag)
+
+    return instance
+
+# Create the instance objects of an emitter. Only the first is made a rigid
+# body by an operator and the rest copy it, so no undo step is pushed for each
+# instance.
+def create_instances(ob, collection, empty, count):
+    if not count:
+        return []
+
+    first = create_instance(ob, collection, empty)
+    rigidbody_collection = bpy.context.scene.rigidbody_world.collection
+
+    instances = [first]
+    for _ in range(count - 1):
+        instance = first.copy()
+        collection.objects.link(instance)
+        rigidbody_collection.objects.link(instance)
+        instances.append(instance)
 
-    def activate(self):
-        self.set_visible(True)
+    return instances
 
-        if self.start_hidden:
-            change_frame(bpy.context, -1)
-            self.set_visible(False)
-            change_frame(bpy.context, 1)
+# Keyframe the launches and removals of a plan onto one object per slot, spread
+# over the given collision collections
+def keyframe_plan(instances, spawn_plan, emitter_layers):
+    layers = [[emitter_layers[slot % len(emitter_layers)]] for slot in range(spawn_plan.slots)]
 
-    def execute(self):
-        displacement = utils.kinematic_displacement(self.emitter.matrix_world.to_translation(), self.velocity, 2)
-        displacement_rotation = utils.kinematic_rotation(self.emitter.matrix_world.to_euler(), self.w, 2)
+    with profiling.PROFILER.stage('keyframes'):
+        slots = spawn_plan.slot
+        for event in spawn_plan.events.tolist():
+            if event >= 0:
+                slot = slots[event]
+                launch_instance(instances[slot], spawn_plan, event, layers[slot])
+            else:
+                row = -event - 1
+                slot = slots[row]
+                expire_instance(instances[slot], spawn_plan, row, layers[slot])
 
-        # Set start keyframe
-        self.ob.location = self.emitter.matrix_world.to_translation()
-        self.ob.rotation_euler = self.emitter.matrix_world.to_euler()
-        self.ob.keyframe_insert('location')
-        self.ob.keyframe_insert('rotation_euler')
+# Replace the instances of an emitter with the spawns of a plan, spread over
+# the emitter's collision collections
+def apply_plan(context, empty, spawn_plan, emitter_layers):
+    # A previous bake no longer matches the new instances
+    cache.stop_playback(context.scene)
 
-        change_frame(bpy.context, 2)
+    ob = get_instance_object(empty)
+    collection = get_instances_collection(empty)
 
-        # Set end keyframe
-        self.ob.location = displacement
-        self.ob.rotation_euler = displacement_rotation
-        self.ob.keyframe_insert('location')
-        self.ob.keyframe_insert('rotation_euler')
+    utils.empty_collection(collection)
 
-        # Set animated checkbox
-        self.set_active(False)
+    with profiling.PROFILER.stage('create_instance'):
+        instances = create_instances(ob, collection, empty, spawn_plan.slots)
 
-        change_frame(bpy.context, 1)
+    keyframe_plan(instances, spawn_plan, emitter_layers)
 
-        # Set unanimated checkbox
-        self.set_active(True)
+    # Reset to starting frame
+    bpy.context.scene.frame_current = 0
 
-    def deactivate(self):
-        self.set_active(True)
-        self.set_visible(True)
+    bpy.context.view_layer.objects.active = empty
 
-        change_frame(bpy.context, 1)
+    # Clear dirty
+    empty.projectile_props.is_dirty = False
 
-        self.set_active(False)
-        self.set_visible(False)
+# Settings that must match for emitters to share instance objects
+def pool_key(empty, layers):
+    props = empty.projectile_props
+    return (tuple(layers), props.start_hidden, props.friction, props.bounciness, props.collision_shape,
+            props.use_collision_proxy, props.proxy_detail, props.use_deactivation,
+            props.deactivate_linear_velocity, props.deactivate_angular_velocity, props.use_drag,
+            props.linear_drag)
 
-    def set_active(self, active):
-        if active:
-            self.ob.rigid_body.collision_collections[0] = True
-            self.ob.rigid_body.collision_collections[19] = False
-            self.ob.rigid_body.kinematic = False
-        else:
-            self.ob.rigid_body.collision_collections[0] = False
-            self.ob.rigid_body.collision_collections[19] = True
-            self.ob.rigid_body.kinematic = True
+# Plan every emitter with the same instance object as an emitter. Emitters that
+# also match in pool_key share one pool of objects, kept in the instances
+# collection of the first of them. allocation holds the collision collections
+# of each emitter. Returns the emitters that were planned.
+def bake_shared(context, empty, allocation):
+    scene = context.scene
 
-        self.ob.keyframe_insert('rigid_body.kinematic')
-        self.ob.keyframe_insert('rigid_body.collision_collections')
+    # A previous bake no longer matches the new instances
+    cache.stop_playback(scene)
 
-    def set_visible(self, visible):
-        if visible:
-            self.ob.hide_viewport = False
-            self.ob.hide_render = False
-        else:
-            self.ob.hide_viewport = True
-            self.ob.hide_render = True
+    ob = get_instance_object(empty)
 
-        self.ob.keyframe_insert('hide_viewport')
-        self.ob.keyframe_insert('hide_render')
+    pools = {}
+    for emitter in registry.EMITTERS.emitters(scene):
+        if get_instance_object(emitter) == ob:
+            utils.empty_collection(get_instances_collection(emitter))
+            pools.setdefault(pool_key(emitter, allocation[emitter.name]), []).append(emitter)
 
-    def get_emitter_velocity(self, context, frame):
-        frame_rate = context.scene.render.fps
+    for emitters in pools.values():
+        first = emitters[0]
 
-        loc_b = self.emitter.matrix_world.to_translation()
+        with profiling.PROFILER.stage('plan'):
+            spawn_plan = plan.merge_plans([plan.plan_spawns(context, emitter) for emitter in emitters])
 
-        change_frame(context, -1)
-        loc_a = self.emitter.matrix_world.to_translation()
-        change_frame(context, 1)
+        with profiling.PROFILER.stage('create_instance'):
+            instances = create_instances(ob, get_instances_collection(first), first, spawn_plan.slots)
 
-        return (loc_b - loc_a) * frame_rate
+        keyframe_plan(instances, spawn_plan, allocation[first.name])
+
+        for emitter in emitters:
+            emitter.projectile_props.is_dirty = False
+
+    # Reset to starting frame
+    scene.frame_current = 0
+
+    context.view_layer.objects.active = empty
+
+    return [emitter for emitters in pools.values() for emitter in emitters]
+
+# Plan and create the instances of an emitter, or of all emitters sharing its
+# instances. allocation holds the collision collections of each emitter, from
+# one utils.allocate_collision_layers call per operator. The plan is
+# remembered so Previous Bake can restore it. Returns the emitters that were
+# planned.
+def bake_emitter(context, empty, allocation):
+    if context.scene.projectile_settings.share_instances:
+        return bake_shared(context, empty, allocation)
+
+    with profiling.PROFILER.stage('plan'):
+        spawn_plan = plan.plan_spawns(context, empty)
+
+    apply_plan(context, empty, spawn_plan, allocation[empty.name])
+
+    history.HISTORY.record(empty, spawn_plan)
+
+    return [empty]
+
+# Store the result of an operator as a single global undo step
+def push_undo(context, message):
+    if bpy.app.background:
+        return
+
+    bpy.ops.ed.undo_push(message=message)
 
 class PHYSICS_OT_projectile_execute(bpy.types.Operator):
     bl_idname = "rigidbody.projectile_execute"
     bl_label = "Execute "
     bl_description = "Create instances based on current emitter settings"
 
+    bake: bpy.props.BoolProperty(
+        name="Bake",
+        description="Start a background bake afterwards if enabled in the settings",
+        default=True,
+        options={'HIDDEN', 'SKIP_SAVE'},
+    )
+
     @classmethod
     def poll(cls, context):
         ob = context.object
         return ob and ob.projectile_props.is_emitter
 
-    def create_instance(self, ob, collection, empty):
-        PADDING = 4
+    def execute(self, context):
+        with profiling.PROFILER.capture('execute'):
+            bake_emitter(context, context.object, utils.allocate_collision_layers(context.scene))
+
+        # Automatic quality depends on the emitter settings
+        if context.scene.projectile_settings.quality == 'auto':
+            utils.set_quality(context)
 
-        name = f"{ob.name}_instance"
-        instance = bpy.data.objects.new(name, ob.data)
+        push_undo(context, "Projectile Execute")
 
-        # Store a link to the emitter in the instance
-        instance.projectile_props["emitter"] = empty
+        if self.bake and context.scene.projectile_settings.background_bake:
+            bake.start_bake(context)
 
-        collection.objects.link(instance)
+        return {'FINISHED'}
+
+
+class PHYSICS_OT_projectile_execute_all(bpy.types.Operator):
+    bl_idname = "rigidbody.projectile_execute_all"
+    bl_label = "Execute All"
+    bl_description = "Apply settings for all emitters that need updating"
+
+    def execute(self, context):
+        # Allocating first marks emitters whose collision collections move as
+        # dirty, so they are executed too
+        allocation = utils.allocate_collision_layers(context.scene)
+
+        emitters = registry.EMITTERS.dirty_emitters(context.scene)
+        executed = bool(emitters)
+
+        with profiling.PROFILER.capture('execute_all'):
+            # Emitters sharing instances are planned together
+            planned = set()
+            for emitter in emitters:
+                if emitter in planned:
+                    continue
+
+                context.view_layer.objects.active = emitter
+                planned.update(bake_emitter(context, emitter, allocation))
+
+        if executed:
+            if context.scene.projectile_settings.quality == 'auto':
+                utils.set_quality(context)
+
+            push_undo(context, "Projectile Execute All")
+
+        # Bake once for all emitters
+        if executed and context.scene.projectile_settings.background_bake:
+            bake.start_bake(context)
 
-        bpy.context.view_layer.objects.active = instance
-        bpy.ops.rigidbody.object_add()
+        return {'FINISHED'}
 
-        projectile_props = empty.projectile_props
-        instance.rigid_body.friction = projectile_props.friction
-        instance.rigid_body.restitution = projectile_props.bounciness
-        instance.rigid_body.collision_shape = projectile_props.collision_shape
 
-        return Instance(instance, empty)
+class PHYSICS_OT_projectile_previous_bake(bpy.types.Operator):
+    bl_idname = "rigidbody.projectile_previous_bake"
+    bl_label = "Previous Bake"
+    bl_description = "Restore the settings and instances of the previous Execute of this emitter"
+
+    @classmethod
+    def poll(cls, context):
+        ob = context.object
+        if context.scene.projectile_settings.share_instances:
+            return False
+
+        return ob and ob.projectile_props.is_emitter and history.HISTORY.can_undo(ob)
 
     def execute(self, context):
         empty = context.object
-        properties = empty.projectile_props
-        pool = []
-        instances = []
+        record = history.HISTORY.undo(empty)
 
-        ob = get_instance_object(empty)
-        collection = get_instances_collection(empty)
+        history.restore_properties(empty.projectile_props, record.properties)
+        allocation = utils.allocate_collision_layers(context.scene)
+        apply_plan(context, empty, record.plan, allocation[empty.name])
 
-        # Max instances is the number of frames in the range
-        start = properties.start_frame
-        end = properties.end_frame
-        frames = end - start
+        if context.scene.projectile_settings.quality == 'auto':
+            utils.set_quality(context)
 
-        number = min(frames, properties.instance_count)
+        push_undo(context, "Projectile Previous Bake")
 
-        step = frames / number
+        if context.scene.projectile_settings.background_bake:
+            bake.start_bake(context)
 
-        utils.empty_collection(collection)
+        return {'FINISHED'}
 
-        # Create list of frames for new instances
-        instance_frames = []
-        for i in range(number):
-            instance_frames.append(start + int(i * step))
 
-        # Create instances
-        for frame in range(start, end + 1):
+class PHYSICS_OT_projectile_reset_profile(bpy.types.Operator):
+    bl_idname = "rigidbody.projectile_reset_profile"
+    bl_label = "Reset"
+    bl_description = "Clear the recorded timers, counters and profiles"
 
-            # Check if a new instance is created on this frame
-            if frame in instance_frames:
-                # Get or create an instance to animate
-                context.scene.frame_set(frame)
-                if pool:
-                    instance = pool.pop()
-                else:
-                    instance = self.create_instance(ob, collection, empty)
+    def execute(self, context):
+        profiling.PROFILER.reset()
+
+        return {'FINISHED'}
 
-                # Set initial position, rotation, frame for instance
-                instances.append(instance)
-                instance.initialize(frame)
 
-                instance.activate()
-                instance.execute()
+class PHYSICS_OT_projectile_export_profile(bpy.types.Operator, ExportHelper):
+    bl_idname = "rigidbody.projectile_export_profile"
+    bl_label = "Export Profile"
+    bl_description = "Save the recorded timers, counters and profiles as JSON"
 
-            # Check if an instance is to be destroyed
-            if instances and instances[0].lifetime and instances[0].end_frame == frame:
-                context.scene.frame_set(frame)
+    filename_ext = ".json"
 
-                instances[0].deactivate()
+    filter_glob: bpy.props.StringProperty(
+        default="*.json",
+        options={'HIDDEN'},
+    )
 
-                # Remove and add to the pool to be reused later
-                instance = instances.pop(0)
-                pool.append(instance)
+    def execute(self, context):
+        profiling.PROFILER.export(self.filepath)
 
+        return {'FINISHED'}
 
-        # Reset to starting frame
-        bpy.context.scene.frame_current = 0
 
-        bpy.context.view_layer.objects.active = empty
+class PHYSICS_OT_projectile_cancel_bake(bpy.types.Operator):
+    bl_idname = "rigidbody.projectile_cancel_bake"
+    bl_label = "Cancel Bake"
+    bl_description = "Stop the running background bake"
+
+    @classmethod
+    def poll(cls, context):
+        return bake.is_baking()
 
-        # Clear dirty
-        properties.is_dirty = False
+    def execute(self, context):
+        bake.cancel_bake()
 
         return {'FINISHED'}
 
 
-class PHYSICS_OT_projectile_execute_all(bpy.types.Operator):
-    bl_idname = "rigidbody.projectile_execute_all"
-    bl_label = "Execute All"
-    bl_description = "Apply settings for all emitters that need updating"
+class PHYSICS_OT_projectile_clear_bake(bpy.types.Operator):
+    bl_idname = "rigidbody.projectile_clear_bake"
+    bl_label = "Clear Bake"
+    bl_description = "Stop playing back the baked cache and run the simulation again"
+
+    @classmethod
+    def poll(cls, context):
+        return bool(context.scene.projectile_settings.cache_path)
 
     def execute(self, context):
-        emitters = [ob for ob in context.scene.objects if ob.projectile_props.is_emitter]
+        cache.stop_playback(context.scene)
 
-        for emitter in emitters:
-            if emitter.projectile_props.is_dirty:
-                context.view_layer.objects.active = emitter
-                bpy.ops.rigidbody.projectile_execute()
+        return {'FINISHED'}
+
+class PHYSICS_OT_projectile_export_cache(bpy.types.Operator, ExportHelper):
+    bl_idname = "rigidbody.projectile_export_cache"
+    bl_label = "Export Cache"
+    bl_description = "Write the transform and visibility of every instance on each frame to a memory mappable .npy file"
+
+    filename_ext = ".npy"
+
+    filter_glob: bpy.props.StringProperty(
+        default="*.npy",
+        options={'HIDDEN'},
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return bool(instance_collections(context.scene))
+
+    def execute(self, context):
+        scene = context.scene
+        current = scene.frame_current
+
+        objects = instance_objects(scene)
+        frames = range(scene.frame_start, scene.frame_end + 1)
+
+        records = cache.create_cache(self.filepath, frames.start, [ob.name for ob in objects], len(frames))
+        cache.record_frames(scene, objects, frames, records)
+        records.flush()
+
+        scene.frame_set(current)
+
+        self.report({'INFO'}, f"Exported {len(objects)} instances over {len(frames)} frames")
+
+        return {'FINISHED'}
+
+
+class PHYSICS_OT_projectile_import_cache(bpy.types.Operator, ImportHelper):
+    bl_idname = "rigidbody.projectile_import_cache"
+    bl_label = "Import Cache"
+    bl_description = "Play back an exported cache onto the instances instead of simulating them"
+
+    filename_ext = ".npy"
+
+    filter_glob: bpy.props.StringProperty(
+        default="*.npy",
+        options={'HIDDEN'},
+    )
+
+    remove_animation: bpy.props.BoolProperty(
+        name="Remove Animation",
+        description="Delete the keyframes of the cached objects, the cache replaces them",
+        default=True,
+    )
+
+    def execute(self, context):
+        if not os.path.exists(cache.header_path(self.filepath)):
+            self.report({'ERROR'}, "No cache header found next to the file")
+            return {'CANCELLED'}
+
+        # The cache holds visibility, so it does not depend on keyframes
+        cache.start_playback(context.scene, self.filepath, visibility=True)
+
+        if self.remove_animation:
+            cache.PLAYBACK.clear_animation()
 
         return {'FINISHED'}
 
+
 classes = (
     PHYSICS_OT_projectile_add,
     PHYSICS_OT_projectile_remove,
     PHYSICS_OT_projectile_execute,
     PHYSICS_OT_projectile_execute_all,
+    PHYSICS_OT_projectile_previous_bake,
+    PHYSICS_OT_projectile_reset_profile,
+    PHYSICS_OT_projectile_export_profile,
+    PHYSICS_OT_projectile_cancel_bake,
+    PHYSICS_OT_projectile_clear_bake,
+    PHYSICS_OT_projectile_export_cache,
+    PHYSICS_OT_projectile_import_cache,
 )
 
 def register():
@@ -0,0 +1,208 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import heapq
+
+import numpy as np
+
+from . import utils
+
+
+# Frames used by the launch keyframes of an instance
+LAUNCH_FRAMES = 3
+
+# Per spawn columns of a plan, other than the assigned slot
+COLUMNS = ('start_frame', 'end_frame', 'location', 'rotation', 'velocity', 'angular_velocity',
+           'launch_location', 'launch_rotation')
+
+
+class SpawnPlan:
+    """ The spawns of an emitter stored as columns, one row per spawn """
+
+    def __init__(self, count):
+        # Frames the instance is launched and removed on (-1 to keep it)
+        self.start_frame = np.zeros(count, dtype=np.int32)
+        self.end_frame = np.full(count, -1, dtype=np.int32)
+
+        # Index of the instance object the spawn is keyframed on
+        self.slot = np.zeros(count, dtype=np.int32)
+
+        # World space launch state
+        self.location = np.zeros((count, 3))
+        self.rotation = np.zeros((count, 3))
+        self.velocity = np.zeros((count, 3))
+        self.angular_velocity = np.zeros((count, 3))
+
+        # Location and rotation at the end of the launch keyframes
+        self.launch_location = np.zeros((count, 3))
+        self.launch_rotation = np.zeros((count, 3))
+
+        # Launches (row) and removals (-row - 1) in keyframing order
+        self.events = np.zeros(0, dtype=np.int32)
+
+        # Number of instance objects needed
+        self.slots = 0
+
+        self.start_hidden = False
+
+    def __len__(self):
+        return len(self.start_frame)
+
+
+# World matrices of an object on each frame and on the frame before. The frame
+# is only changed if the transform depends on more than the object's F-Curves.
+def world_matrices(context, ob, frames):
+    if utils.transform_is_evaluable(ob):
+        matrices = [utils.evaluate_world_matrix(ob, frame) for frame in frames]
+        previous = [utils.evaluate_world_matrix(ob, frame - 1) for frame in frames]
+        return matrices, previous
+
+    matrices = []
+    previous = []
+    current = context.scene.frame_current
+    for frame in frames:
+        utils.frame_set(context, frame - 1)
+        previous.append(ob.matrix_world.copy())
+        utils.frame_set(context, frame)
+        matrices.append(ob.matrix_world.copy())
+    utils.frame_set(context, current)
+
+    return matrices, previous
+
+# Give each spawn an instance object, reusing the objects of removed spawns,
+# and order the launch and removal keyframes. Spawns removed before a frame
+# free their object for spawns on that frame.
+def assign_slots(plan):
+    events = []
+    expiring = []
+    free = []
+
+    for row in range(len(plan)):
+        start = plan.start_frame[row]
+        while expiring and expiring[0][0] < start:
+            _, expired = heapq.heappop(expiring)
+            events.append(-expired - 1)
+            free.append(plan.slot[expired])
+
+        if free:
+            plan.slot[row] = free.pop()
+        else:
+            plan.slot[row] = plan.slots
+            plan.slots += 1
+
+        events.append(row)
+        if plan.end_frame[row] >= 0:
+            heapq.heappush(expiring, (plan.end_frame[row], row))
+
+    # Remove instances that outlive the last spawn
+    while expiring:
+        _, expired = heapq.heappop(expiring)
+        events.append(-expired - 1)
+
+    plan.events = np.array(events, dtype=np.int32)
+
+# Combine the plans of emitters sharing instance objects into one, ordered by
+# launch frame, and assign slots across all of them. The number of objects is
+# then the peak number of spawns alive at once rather than the sum over the
+# emitters.
+def merge_plans(plans):
+    merged = SpawnPlan(sum(len(spawn_plan) for spawn_plan in plans))
+    merged.start_hidden = any(spawn_plan.start_hidden for spawn_plan in plans)
+    if not len(merged):
+        return merged
+
+    order = np.argsort(np.concatenate([spawn_plan.start_frame for spawn_plan in plans]), kind='stable')
+    for column in COLUMNS:
+        setattr(merged, column, np.concatenate([getattr(spawn_plan, column) for spawn_plan in plans])[order])
+
+    assign_slots(merged)
+
+    return merged
+
+# Removal frames of spawns launched on start_frames that first hit a collider
+# impacts frames later, leaving them the settle time of the emitter to come to
+# rest. Spawns that hit nothing (an impact of -1) are kept.
+def settled_end_frames(props, start_frames, impacts):
+    settled = start_frames + np.maximum(impacts + props.settle_frames, LAUNCH_FRAMES)
+    return np.where(impacts >= 0, settled, -1).astype(np.int32)
+
+# Move the removal frames of spawns earlier to when they leave the kill volume
+# of their emitter, if any. Spawns are given as arrays of launch frames,
+# locations and velocities, and end_frames is updated in place.
+def clamp_to_kill_volume(context, emitter, start_frames, locations, velocities, end_frames):
+    props = emitter.projectile_props
+    if not props.kill_volume:
+        return
+
+    for row in range(len(start_frames)):
+        start = int(start_frames[row])
+        length = (not props.auto_lifetime and props.lifetime) or max(1, context.scene.frame_end - start)
+
+        exit_frame = utils.kill_volume_exit(context, emitter, locations[row], velocities[row], length)
+        if exit_frame is not None:
+            # Leave room for the launch keyframes
+            exit_frame = start + max(exit_frame, LAUNCH_FRAMES)
+            if end_frames[row] < 0 or exit_frame < end_frames[row]:
+                end_frames[row] = exit_frame
+
+# Plan every spawn of an emitter
+def plan_spawns(context, emitter):
+    scene = context.scene
+    props = emitter.projectile_props
+    frame_rate = scene.render.fps
+
+    frames = utils.spawn_frames(props)
+    if not frames:
+        plan = SpawnPlan(0)
+        plan.start_hidden = props.start_hidden
+        return plan
+
+    # One spawn per frame and launch point
+    matrices, previous = world_matrices(context, utils.launch_object(emitter), frames)
+    launch_frames, locations, rotations, velocities, angular_velocities = utils.launch_states(
+        emitter, frames, frame_rate, matrices, previous)
+
+    plan = SpawnPlan(len(launch_frames))
+    plan.start_hidden = props.start_hidden
+    plan.start_frame[:] = launch_frames
+    plan.location[:] = locations
+    plan.rotation[:] = rotations
+    plan.velocity[:] = velocities
+    plan.angular_velocity[:] = angular_velocities
+
+    if props.auto_lifetime:
+        # Remove instances once they have settled after their first impact
+        lengths = np.maximum(1, scene.frame_end - plan.start_frame)
+        impacts = utils.impact_frames(context, emitter, plan.location, plan.velocity, lengths)
+        plan.end_frame[:] = settled_end_frames(props, plan.start_frame, impacts)
+    elif props.lifetime:
+        plan.end_frame[:] = plan.start_frame + props.lifetime
+
+    # Remove instances once they leave the kill volume
+    clamp_to_kill_volume(context, emitter, plan.start_frame, plan.location, plan.velocity, plan.end_frame)
+
+    # State two frames after launch, where the instance becomes dynamic
+    linear_drag, quadratic_drag = utils.drag_coefficients(emitter)
+    positions, _ = utils.integrate_states(
+        plan.location, plan.velocity, 2, frame_rate, utils.scene_gravity(scene), linear_drag, quadratic_drag)
+    plan.launch_location[:] = positions[:, -1]
+    plan.launch_rotation[:] = plan.rotation + plan.angular_velocity * (2.0 / frame_rate)
+
+    assign_slots(plan)
+
+    return plan
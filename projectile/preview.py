@@ -0,0 +1,209 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Ghost preview of planned instances. Each spawn is shown as a wireframe box at
+# its analytic position on the current frame, without creating any objects or
+# keyframes.
+
+import bpy
+import numpy as np
+
+from . import plan
+from . import profiling
+from . import registry
+from . import utils
+
+
+# Edges of an object bounding box as pairs of bound_box corner indices
+BOX_EDGES = (0, 1, 1, 2, 2, 3, 3, 0, 4, 5, 5, 6, 6, 7, 7, 4, 0, 4, 1, 5, 2, 6, 3, 7)
+
+
+class GhostTracks:
+    """ Positions on each frame after launch of the planned spawns of an emitter """
+
+    def __init__(self, count, length):
+        self.start_frame = np.zeros(count, dtype=np.int32)
+        self.end_frame = np.full(count, -1, dtype=np.int32)
+
+        # Frames after launch until each spawn comes to rest at its first impact
+        self.rest = np.full(count, length, dtype=np.int32)
+
+        self.positions = np.zeros((count, length + 1, 3))
+        self.rotation = np.zeros((count, 3))
+        self.angular_velocity = np.zeros((count, 3))
+
+        # Local bounding box edges of the instance object, as pairs of corners
+        self.edges = np.zeros((count, len(BOX_EDGES), 3))
+
+    def __len__(self):
+        return len(self.start_frame)
+
+
+# Tracks of each emitter by name, the tracks of all emitters of the scene
+# joined together with the emitter names they were joined from, and the line
+# coordinates of the last frame
+TRACKS = {}
+SCENE_TRACKS = None
+COORDINATES = None
+
+def invalidate(emitter=None):
+    global SCENE_TRACKS, COORDINATES
+
+    if emitter is None:
+        TRACKS.clear()
+    else:
+        TRACKS.pop(emitter.name, None)
+
+    SCENE_TRACKS = None
+    COORDINATES = None
+
+# Fly every spawn of an emitter from its launch state, using the same launch
+# states as the trajectory preview, and stop it at the first collider hit
+def calculate_tracks(context, emitter):
+    scene = context.scene
+    props = emitter.projectile_props
+    frame_rate = scene.render.fps
+
+    ob = utils.get_attr(props, "instance_object", None)
+    frames = utils.spawn_frames(props)
+    if ob is None or not frames:
+        return GhostTracks(0, 1)
+
+    launch_frames, starts, rotations, velocities, angular_velocities = utils.spawn_states(
+        emitter, frames, frame_rate)
+
+    length = max(1, scene.frame_end - min(frames))
+    tracks = GhostTracks(len(launch_frames), length)
+    tracks.start_frame[:] = launch_frames
+    if props.lifetime and not props.auto_lifetime:
+        tracks.end_frame[:] = tracks.start_frame + props.lifetime
+    tracks.rotation[:] = rotations
+    tracks.angular_velocity[:] = angular_velocities
+    tracks.edges[:] = np.array([tuple(corner) for corner in ob.bound_box])[list(BOX_EDGES)]
+
+    linear_drag, quadratic_drag = utils.drag_coefficients(emitter)
+    tracks.positions, _ = utils.integrate_states(
+        starts, velocities, length, frame_rate, utils.scene_gravity(scene), linear_drag, quadratic_drag)
+
+    impacts = np.full(len(launch_frames), -1, dtype=np.int32)
+    for i, frame in enumerate(launch_frames.tolist()):
+        count = max(1, scene.frame_end - frame)
+        hit = utils.find_impact(context, emitter, tracks.positions[i, :count + 1])
+        if hit:
+            segment, cast = hit
+            tracks.positions[i, segment + 1:] = tuple(cast[1])
+            tracks.rest[i] = impacts[i] = segment + 1
+
+    if props.auto_lifetime:
+        tracks.end_frame[:] = plan.settled_end_frames(props, tracks.start_frame, impacts)
+
+    # Spawns disappear when they leave the kill volume, as in the bake
+    plan.clamp_to_kill_volume(context, emitter, tracks.start_frame, starts, velocities, tracks.end_frame)
+
+    return tracks
+
+def emitter_tracks(context, emitter):
+    tracks = TRACKS.get(emitter.name)
+    if tracks is None:
+        tracks = TRACKS[emitter.name] = calculate_tracks(context, emitter)
+
+    return tracks
+
+# Tracks of many emitters as one, padding the shorter positions with their
+# last row, where ghost_transforms would hold them anyway
+def join_tracks(tracks):
+    length = max(t.positions.shape[1] for t in tracks) - 1
+    joined = GhostTracks(sum(len(t) for t in tracks), length)
+
+    for name in ('start_frame', 'end_frame', 'rest', 'rotation', 'angular_velocity', 'edges'):
+        setattr(joined, name, np.concatenate([getattr(t, name) for t in tracks]))
+
+    joined.positions = np.concatenate([
+        np.pad(t.positions, ((0, 0), (0, length + 1 - t.positions.shape[1]), (0, 0)), mode='edge')
+        for t in tracks])
+
+    return joined
+
+# Tracks of every emitter in the scene joined together, so each frame is
+# transformed in one batch
+def scene_tracks(context):
+    global SCENE_TRACKS
+
+    emitters = registry.EMITTERS.emitters(context.scene)
+    names = [emitter.name for emitter in emitters]
+    if SCENE_TRACKS is None or SCENE_TRACKS[0] != names:
+        tracks = [emitter_tracks(context, emitter) for emitter in emitters]
+        SCENE_TRACKS = (names, join_tracks(tracks) if tracks else GhostTracks(0, 1))
+
+    return SCENE_TRACKS[1]
+
+# Rotation matrices of XYZ euler rotations, one per row
+def euler_matrices(rotations):
+    cx, cy, cz = np.cos(rotations).T
+    sx, sy, sz = np.sin(rotations).T
+
+    matrices = np.empty((len(rotations), 3, 3))
+    matrices[:, 0] = np.stack((cy * cz, sx * sy * cz - cx * sz, cx * sy * cz + sx * sz), axis=1)
+    matrices[:, 1] = np.stack((cy * sz, sx * sy * sz + cx * cz, cx * sy * sz - sx * cz), axis=1)
+    matrices[:, 2] = np.stack((-sy, sx * cy, cx * cy), axis=1)
+
+    return matrices
+
+# Locations, rotations and box edges of the spawns alive on a frame. Spawns are
+# shown from their launch until their removal keyframe.
+def ghost_transforms(tracks, frame, frame_rate):
+    age = frame - tracks.start_frame
+    alive = np.flatnonzero((age >= 0) & ((tracks.end_frame < 0) | (frame <= tracks.end_frame)))
+
+    age = np.minimum(age[alive], tracks.positions.shape[1] - 1)
+    spin = np.minimum(age, tracks.rest[alive]) / frame_rate
+
+    locations = tracks.positions[alive, age]
+    rotations = tracks.rotation[alive] + tracks.angular_velocity[alive] * spin[:, np.newaxis]
+
+    return locations, rotations, tracks.edges[alive]
+
+# Line coordinates of the bounding boxes of all ghosts on a frame
+def calculate_coordinates(context, frame):
+    locations, rotations, edges = ghost_transforms(scene_tracks(context), frame, context.scene.render.fps)
+
+    lines = np.einsum('nij,nkj->nki', euler_matrices(rotations), edges) + locations[:, np.newaxis]
+
+    return lines.reshape(-1, 3).astype(np.float32)
+
+# Ghost line coordinates for the current frame, calculated once per frame
+def ghost_coordinates(context):
+    global COORDINATES
+
+    frame = context.scene.frame_current
+    if COORDINATES is None or COORDINATES[0] != frame:
+        with profiling.PROFILER.stage('ghosts'):
+            COORDINATES = (frame, calculate_coordinates(context, frame))
+
+    return COORDINATES[1]
+
+def frame_change_handler(scene, depsgraph=None):
+    ghost_coordinates(bpy.context)
+
+def add_handler():
+    if frame_change_handler not in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.append(frame_change_handler)
+
+def remove_handler():
+    if frame_change_handler in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(frame_change_handler)
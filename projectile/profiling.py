@@ -0,0 +1,110 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import time
+
+import bpy
+
+
+# Number of functions listed in a Python profile
+PROFILE_LINES = 40
+
+
+class Profiler:
+    """ Opt-in stage timers, API call counters and Python profiles """
+
+    def __init__(self):
+        self.enabled = False
+        self.python = False
+        self.reset()
+
+    def reset(self):
+        # Stage name to [total seconds, calls]
+        self.timers = {}
+        # API name to number of calls
+        self.counters = {}
+        # Stage name to the text of its last Python profile
+        self.profiles = {}
+
+    def count(self, name, calls=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + calls
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += time.perf_counter() - start
+            timer[1] += 1
+
+    # Time a stage and also capture a Python profile of it if enabled
+    @contextlib.contextmanager
+    def capture(self, name):
+        if not self.enabled or not self.python:
+            with self.stage(name):
+                yield
+            return
+
+        profile = cProfile.Profile()
+        with self.stage(name):
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        self.profiles[name] = text.getvalue()
+
+    def to_dict(self):
+        from . import bl_info
+
+        return {
+            "addon_version": ".".join(str(v) for v in bl_info["version"]),
+            "blender_version": bpy.app.version_string,
+            "file": bpy.data.filepath,
+            "timers": {name: {"seconds": total, "calls": calls} for name, (total, calls) in self.timers.items()},
+            "counters": dict(self.counters),
+            "profiles": dict(self.profiles),
+        }
+
+    def export(self, filepath):
+        with open(filepath, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+PROFILER = Profiler()
+
+# Apply the profiling settings of a scene
+def sync(scene):
+    settings = scene.projectile_settings
+    PROFILER.enabled = settings.profiling
+    PROFILER.python = settings.profile_python
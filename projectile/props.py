@@ -18,20 +18,24 @@
 
 import bpy
 
+from . import preview
+from . import profiling
+from . import registry
 from . import utils
 
 
-def enum_prop_to_py(enum_prop):
-    items = []
-    for item in enum_prop:
-        items.append((
-            item.identifier,
-            item.name,
-            item.description,
-            item.icon,
-            item.value
-        ))
-    return items
+# Rigid body collision shapes, matching RigidBodyObject.collision_shape
+COLLISION_SHAPES = [
+    ('BOX', "Box", "Box-like shapes (i.e. cubes), including planes (i.e. ground planes)", 'MESH_CUBE', 0),
+    ('SPHERE', "Sphere", "", 'MESH_UVSPHERE', 1),
+    ('CAPSULE', "Capsule", "", 'MESH_CAPSULE', 2),
+    ('CYLINDER', "Cylinder", "", 'MESH_CYLINDER', 3),
+    ('CONE', "Cone", "", 'MESH_CONE', 4),
+    ('CONVEX_HULL', "Convex Hull", "A mesh-like surface encompassing (i.e. shrinkwrap over) all vertices "
+                                   "(best results with fewer vertices)", 'MESH_ICOSPHERE', 5),
+    ('MESH', "Mesh", "Mesh consisting of triangles only, allowing for more detailed interactions than "
+                     "convex hulls", 'MESH_MONKEY', 6),
+]
 
 
 def subscribe_to_rna_props():
@@ -73,6 +77,14 @@ def props_dirty(self, context):
     ob = context.object
     if ob:
         ob.projectile_props.is_dirty = True
+        preview.invalidate(ob)
+
+def collider_shape_callback(self, context):
+    utils.invalidate_colliders()
+
+# Only meshes have vertices and faces to emit from
+def emit_source_poll(self, ob):
+    return ob.type == 'MESH'
 
 def call_multiple_functions(funcs, self, context):
     for f in funcs:
@@ -135,6 +147,75 @@ class ProjectileObject(bpy.types.PropertyGroup):
         update=props_dirty
     )
 
+    spread_angle: bpy.props.FloatProperty(
+        name="Spread",
+        description="Maximum angle between the velocity of each instance and the emitter velocity",
+        default=0.0,
+        min=0.0,
+        max=3.141593,
+        subtype='ANGLE',
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
+    speed_jitter: bpy.props.FloatProperty(
+        name="Speed Jitter",
+        description="Random variation of the speed of each instance, as a fraction of the emitter speed",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR',
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
+    angular_jitter: bpy.props.FloatProperty(
+        name="Angular Jitter",
+        description="Random variation of each axis of the angular velocity of each instance",
+        default=0.0,
+        min=0.0,
+        unit='ROTATION',
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
+    seed: bpy.props.IntProperty(
+        name="Seed",
+        description="Seed for the random spread, the same seed always gives the same instances",
+        default=0,
+        min=0,
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
+    emit_from: bpy.props.EnumProperty(
+        name="Emit From",
+        items=[("ORIGIN", "Origin", "Launch one instance per frame from the emitter"),
+               ("VERTS", "Vertices", "Launch one instance per frame from every vertex of the source mesh"),
+               ("FACES", "Faces", "Launch one instance per frame from the center of every face of the source mesh")],
+        default='ORIGIN',
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
+    emit_source: bpy.props.PointerProperty(
+        name="Source",
+        description="Mesh whose vertices or faces instances are launched from, following its animation",
+        type=bpy.types.Object,
+        poll=emit_source_poll,
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
+    normal_speed: bpy.props.FloatProperty(
+        name="Normal Velocity",
+        description="Speed added along the normal of each vertex or face",
+        default=0.0,
+        unit='VELOCITY',
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
     start_hidden: bpy.props.BoolProperty(
         name="Start Hidden",
         description="Hide the object before the start frame",
@@ -152,6 +233,24 @@ class ProjectileObject(bpy.types.PropertyGroup):
         update=props_dirty
     )
 
+    auto_lifetime: bpy.props.BoolProperty(
+        name="Auto Lifetime",
+        description="Remove each instance a settle time after its predicted first impact. "
+                    "Instances that hit nothing are kept",
+        default=False,
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
+    settle_frames: bpy.props.IntProperty(
+        name="Settle Frames",
+        description="Frames each instance stays after its first impact with auto lifetime",
+        default=24,
+        min=0,
+        options={'HIDDEN'},
+        update=props_dirty
+    )
+
     radius: bpy.props.FloatProperty(
         name="Radius",
         description="Radius (magnitude) of velocity",
@@ -204,10 +303,142 @@ class ProjectileObject(bpy.types.PropertyGroup):
         update=props_dirty,
     )
 
+    use_collision_proxy: bpy.props.BoolProperty(
+        name="Collision Proxy",
+        description="Simulate instances with a simplified convex hull of the instance mesh, "
+                    "the displayed and rendered mesh is unchanged",
+        default=False,
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    proxy_detail: bpy.props.IntProperty(
+        name="Proxy Detail",
+        description="Maximum number of vertices in the collision proxy",
+        default=32,
+        min=4,
+        max=256,
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    collision_group: bpy.props.EnumProperty(
+        name="Collide With",
+        items=[("SHARED", "Everything", "Collide with the environment and instances of other emitters"),
+               ("EMITTER", "Emitter", "Collide with the environment and instances of this emitter only"),
+               ("ENVIRONMENT", "Environment", "Collide with the environment, instances are spread over "
+                                              "separate collision collections to reduce collisions with each other "
+                                              "and other emitters. Collections are shared once all are in use")],
+        default='SHARED',
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    collision_layer: bpy.props.IntProperty(
+        name="Collision Collection",
+        description="Collision collection assigned to the instances of this emitter (for internal use)",
+        default=0,
+        min=0,
+        max=19,
+        options={'HIDDEN'},
+    )
+
+    collision_layers: bpy.props.BoolVectorProperty(
+        name="Collision Collections",
+        description="Collision collections the instances of this emitter were last allocated (for internal use)",
+        default=(False,) * utils.COLLISION_LAYERS,
+        size=utils.COLLISION_LAYERS,
+        options={'HIDDEN'},
+    )
+
+    kill_volume: bpy.props.PointerProperty(
+        name="Kill Volume",
+        description="Remove instances once their trajectory leaves the bounds of this object",
+        type=bpy.types.Object,
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    use_deactivation: bpy.props.BoolProperty(
+        name="Deactivation",
+        description="Let instances sleep once they come to rest so they no longer cost solver time",
+        default=False,
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    deactivate_linear_velocity: bpy.props.FloatProperty(
+        name="Linear Velocity",
+        description="Linear velocity below which instances are put to sleep",
+        default=0.4,
+        min=0.0,
+        unit='VELOCITY',
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    deactivate_angular_velocity: bpy.props.FloatProperty(
+        name="Angular Velocity",
+        description="Angular velocity below which instances are put to sleep",
+        default=0.5,
+        min=0.0,
+        unit='VELOCITY',
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    use_drag: bpy.props.BoolProperty(
+        name="Air Drag",
+        description="Slow instances down with air resistance",
+        default=False,
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    linear_drag: bpy.props.FloatProperty(
+        name="Linear Drag",
+        description="Drag proportional to speed (per second). Applied to instances as rigid body damping",
+        default=0.1,
+        min=0.0,
+        soft_max=1.0,
+        step=1,
+        precision=3,
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    quadratic_drag: bpy.props.FloatProperty(
+        name="Quadratic Drag",
+        description="Drag proportional to the square of speed (per meter). The rigid body solver cannot "
+                    "model this, so it only affects trajectories and launch keyframes",
+        default=0.0,
+        min=0.0,
+        soft_max=0.1,
+        step=0.1,
+        precision=4,
+        options={'HIDDEN'},
+        update=props_dirty,
+    )
+
+    collider_shape: bpy.props.EnumProperty(
+        name="Collider Shape",
+        description="Shape trajectories are tested against when this object is a collider",
+        items=[
+            ('AUTO', "Automatic", "Use a plane, box or sphere if the mesh is one, otherwise the mesh"),
+            ('MESH', "Mesh", "Ray cast against the mesh"),
+            ('PLANE', "Plane", "Plane through the middle of the bounding box"),
+            ('BOX', "Box", "Bounding box"),
+            ('SPHERE', "Sphere", "Sphere fitting the bounding box"),
+        ],
+        default='AUTO',
+        options={'HIDDEN'},
+        update=collider_shape_callback
+    )
+
     collision_shape: bpy.props.EnumProperty(
         name="Collision Shape",
         description="Collision Shape of object in Rigid Body Simulations",
-        items=enum_prop_to_py(bpy.types.RigidBodyObject.bl_rna.properties['collision_shape'].enum_items),
+        items=COLLISION_SHAPES,
         default='CONVEX_HULL',
         update=props_dirty,
     )
@@ -220,6 +451,17 @@ def draw_trajectories_callback(self, context):
 def set_quality_callback(self, context):
     utils.set_quality(context)
 
+def ghost_preview_callback(self, context):
+    utils.toggle_ghost_preview()
+
+def share_instances_callback(self, context):
+    # Instances move between the collections of emitters
+    for ob in registry.EMITTERS.emitters(context.scene):
+        ob.projectile_props.is_dirty = True
+
+def profiling_callback(self, context):
+    profiling.sync(context.scene)
+
 class ProjectileSettings(bpy.types.PropertyGroup):
     draw_trajectories: bpy.props.EnumProperty(
         name="Draw Trajectories",
@@ -231,12 +473,29 @@ class ProjectileSettings(bpy.types.PropertyGroup):
         update=draw_trajectories_callback
     )
 
+    spawn_trajectories: bpy.props.BoolProperty(
+        name="Spawn Trajectories",
+        description="Draw the trajectory of every instance spawned between the start and end frames",
+        default=False,
+        options={'HIDDEN'},
+    )
+
+    preview_bounces: bpy.props.IntProperty(
+        name="Bounces",
+        description="Number of bounces to preview on each trajectory using the emitter friction and bounciness",
+        default=0,
+        min=0,
+        soft_max=10,
+        options={'HIDDEN'},
+    )
+
     quality: bpy.props.EnumProperty(
         name="Quality",
         items=[("very_low", "Particle", "Very low quality can help with instancing that behaves like particles"),
                ("low", "Low", "Use low quality solver settings"),
                ("medium", "Medium", "Use medium quality solver settings"),
-               ("high", "High", "Use high quality solver settings")],
+               ("high", "High", "Use high quality solver settings"),
+               ("auto", "Auto", "Use just enough substeps to keep the fastest instances from passing through colliders")],
         default='very_low',
         options={'HIDDEN'},
         update=set_quality_callback)
@@ -248,6 +507,69 @@ class ProjectileSettings(bpy.types.PropertyGroup):
         default=True
     )
 
+    ghost_preview: bpy.props.BoolProperty(
+        name="Ghost Preview",
+        description="Draw the bounding boxes of planned instances where they would be on the current frame, "
+                    "without executing",
+        options={'HIDDEN'},
+        default=False,
+        update=ghost_preview_callback
+    )
+
+    background_bake: bpy.props.BoolProperty(
+        name="Bake in Background",
+        description="After Execute, simulate the frames where projectiles exist in a background "
+                    "Blender process and play back the result",
+        options={'HIDDEN'},
+        default=False
+    )
+
+    share_instances: bpy.props.BoolProperty(
+        name="Share Instances",
+        description="Reuse instance objects between emitters with the same instance object and physics "
+                    "settings, so only as many objects exist as projectiles are alive at once",
+        options={'HIDDEN'},
+        default=False,
+        update=share_instances_callback
+    )
+
+    cache_path: bpy.props.StringProperty(
+        name="Cache Path",
+        description="Transform cache currently played back (for internal use)",
+        subtype='FILE_PATH',
+        options={'HIDDEN'},
+    )
+
+    cache_visibility: bpy.props.BoolProperty(
+        name="Cache Visibility",
+        description="Visibility is played back from the cache (for internal use)",
+        options={'HIDDEN'},
+        default=False
+    )
+
+    profiling: bpy.props.BoolProperty(
+        name="Profiling",
+        description="Record the time spent in each stage of Execute and trajectory drawing",
+        options={'HIDDEN'},
+        default=False,
+        update=profiling_callback
+    )
+
+    profile_python: bpy.props.BoolProperty(
+        name="Python Profile",
+        description="Also capture a cProfile report of each Execute (slow)",
+        options={'HIDDEN'},
+        default=False,
+        update=profiling_callback
+    )
+
+    simulation_enabled: bpy.props.BoolProperty(
+        name="Simulation Enabled",
+        description="Rigid body world state before cache playback (for internal use)",
+        options={'HIDDEN'},
+        default=True
+    )
+
 
 classes = (
     ProjectileObject,
@@ -260,6 +582,12 @@ def register():
 
     bpy.types.Object.projectile_props = bpy.props.PointerProperty(type=ProjectileObject)
     bpy.types.Scene.projectile_settings = bpy.props.PointerProperty(type=ProjectileSettings)
+    bpy.types.Mesh.projectile_proxy = bpy.props.PointerProperty(
+        name="Collision Proxy",
+        description="Simplified mesh instances of this mesh collide with (for internal use)",
+        type=bpy.types.Mesh,
+        options={'HIDDEN'},
+    )
 
 def unregister():
     for cls in classes:
@@ -267,3 +595,4 @@ def unregister():
 
     del bpy.types.Object.projectile_props
     del bpy.types.Scene.projectile_settings
+    del bpy.types.Mesh.projectile_proxy
@@ -0,0 +1,130 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import bpy
+import bmesh
+import hashlib
+import math
+import numpy as np
+
+
+# Collision shapes that are built from the mesh and benefit from a proxy
+PROXY_SHAPES = {'CONVEX_HULL', 'MESH'}
+
+# Directions spread evenly over a sphere (Fibonacci lattice)
+def sphere_directions(count):
+    i = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * i / count
+    radius = np.sqrt(1.0 - z ** 2)
+    angle = math.pi * (1.0 + math.sqrt(5.0)) * i
+
+    return np.stack((radius * np.cos(angle), radius * np.sin(angle), z), axis=1)
+
+def mesh_coordinates(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    return co.reshape(-1, 3)
+
+# Vertices (rows of co) that lie furthest along each direction. These are all
+# on the convex hull, so their hull approximates the hull of the whole mesh.
+def support_points(co, count):
+    indices = {int(np.argmax(co @ direction)) for direction in sphere_directions(count)}
+
+    return co[sorted(indices)]
+
+def create_proxy_mesh(name, points):
+    bm = bmesh.new()
+    for point in points:
+        bm.verts.new(point)
+
+    # Remove any points that ended up inside the hull
+    hull = bmesh.ops.convex_hull(bm, input=bm.verts)
+    bmesh.ops.delete(bm, geom=hull['geom_interior'] + hull['geom_unused'], context='VERTS')
+
+    # Flat meshes have no volume to build a hull from
+    if len(bm.faces) < 4:
+        bm.free()
+        return None
+
+    mesh = bpy.data.meshes.new(name)
+    bm.to_mesh(mesh)
+    bm.free()
+
+    return mesh
+
+# Get the collision proxy stored on the mesh of an instance object, creating a
+# new one if the vertices or the detail changed. An outdated proxy is only
+# removed once no instance uses it anymore. Returns None if no proxy can be
+# built.
+def get_collision_proxy(ob, detail):
+    mesh = ob.data
+    co = mesh_coordinates(mesh)
+    key = f"{detail}:{hashlib.sha1(co.tobytes()).hexdigest()}"
+
+    proxy = mesh.projectile_proxy
+    if proxy and proxy.get("projectile_proxy") == key:
+        return proxy
+
+    # The pointer on the mesh is the last user of an unused proxy
+    mesh.projectile_proxy = None
+    if proxy and proxy.users == 0:
+        bpy.data.meshes.remove(proxy)
+
+    proxy = create_proxy_mesh(f"{mesh.name}_proxy", support_points(co, detail))
+    if proxy:
+        proxy["projectile_proxy"] = key
+        mesh.projectile_proxy = proxy
+
+    return proxy
+
+# Geometry nodes group that replaces the proxy mesh of an instance with the
+# mesh of the instance object for display and rendering
+def get_render_node_group(ob):
+    name = f"projectile_render_{ob.name}"
+
+    group = bpy.data.node_groups.get(name)
+    if group:
+        return group
+
+    group = bpy.data.node_groups.new(name, 'GeometryNodeTree')
+    if bpy.app.version >= (4, 0, 0):
+        group.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+        group.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    else:
+        group.inputs.new('NodeSocketGeometry', "Geometry")
+        group.outputs.new('NodeSocketGeometry', "Geometry")
+
+    group.nodes.new('NodeGroupInput')
+    output = group.nodes.new('NodeGroupOutput')
+
+    info = group.nodes.new('GeometryNodeObjectInfo')
+    info.transform_space = 'ORIGINAL'
+    info.inputs['Object'].default_value = ob
+
+    group.links.new(info.outputs['Geometry'], output.inputs[0])
+
+    return group
+
+# Simulate an instance with the collision proxy while showing the full mesh
+def use_collision_proxy(instance, ob):
+    modifier = instance.modifiers.new("Projectile Render Mesh", 'NODES')
+    modifier.node_group = get_render_node_group(ob)
+
+    # Build the collision shape from the proxy rather than the modifier result
+    instance.rigid_body.mesh_source = 'BASE'
+    instance.rigid_body.collision_shape = 'CONVEX_HULL'
@@ -0,0 +1,85 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import bpy
+
+
+class EmitterRegistry:
+    """ The emitters of each scene, rescanned only after objects are added or removed """
+
+    def __init__(self):
+        # Scene to an (ordered) dict of its emitters
+        self.scenes = {}
+
+    # Forget the emitters of a scene, or of all scenes, to scan them again on
+    # next use
+    def invalidate(self, scene=None):
+        if scene is None:
+            self.scenes.clear()
+        else:
+            self.scenes.pop(scene, None)
+
+    def scan(self, scene):
+        emitters = {ob: None for ob in scene.objects if ob.projectile_props.is_emitter}
+        self.scenes[scene] = emitters
+
+        return emitters
+
+    def emitters(self, scene):
+        emitters = self.scenes.get(scene)
+        if emitters is None:
+            emitters = self.scan(scene)
+
+        # Objects removed without a depsgraph update can no longer be accessed
+        try:
+            if all(ob.projectile_props.is_emitter for ob in emitters):
+                return list(emitters)
+        except ReferenceError:
+            pass
+
+        return list(self.scan(scene))
+
+    def dirty_emitters(self, scene):
+        return [ob for ob in self.emitters(scene) if ob.projectile_props.is_dirty]
+
+    def add(self, scene, ob):
+        if scene in self.scenes:
+            self.scenes[scene][ob] = None
+
+    def remove(self, scene, ob):
+        if scene in self.scenes:
+            self.scenes[scene].pop(ob, None)
+
+    # Collection changes link or unlink objects, so the scene is scanned again.
+    # Emitters created another way (e.g. from a script) are added directly.
+    def depsgraph_update(self, scene, depsgraph):
+        if scene not in self.scenes:
+            return
+
+        for update in depsgraph.updates:
+            if isinstance(update.id, bpy.types.Collection):
+                self.invalidate(scene)
+                return
+
+            if isinstance(update.id, bpy.types.Object):
+                ob = update.id.original
+                if ob.projectile_props.is_emitter and ob not in self.scenes[scene]:
+                    self.scenes[scene][ob] = None
+
+
+EMITTERS = EmitterRegistry()
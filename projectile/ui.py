@@ -18,7 +18,9 @@
 
 import bpy
 
-from . import utils
+from . import bake
+from . import profiling
+from . import registry
 
 
 # This class holds the handler for drawing trajectories in the 3D view.
@@ -33,9 +35,12 @@ class PHYSICS_OT_projectle_draw(bpy.types.Operator):
 
     @staticmethod
     def add_handler():
+        # Only load the GPU module once trajectories are drawn
+        from . import draw
+
         if PHYSICS_OT_projectle_draw._handle is None:
             PHYSICS_OT_projectle_draw._handle = bpy.types.SpaceView3D.draw_handler_add(
-                utils.draw_trajectory,
+                draw.draw_trajectory,
                 (),
                 'WINDOW',
                 'POST_VIEW')
@@ -51,12 +56,39 @@ class PHYSICS_OT_projectle_draw(bpy.types.Operator):
         return {'FINISHED'}
 
 
+# Draw handler for ghost previews of planned instances, wrapped like the
+# trajectory draw handler
+class PHYSICS_OT_projectile_draw_ghosts(bpy.types.Operator):
+    bl_idname = "rigidbody.projectile_draw_ghosts"
+    bl_label = "Draw Ghosts"
+    bl_description = "Ghost preview draw handler"
+
+    _handle = None
+
+    @staticmethod
+    def add_handler():
+        from . import draw
+
+        if PHYSICS_OT_projectile_draw_ghosts._handle is None:
+            PHYSICS_OT_projectile_draw_ghosts._handle = bpy.types.SpaceView3D.draw_handler_add(
+                draw.draw_ghosts,
+                (),
+                'WINDOW',
+                'POST_VIEW')
+
+    @staticmethod
+    def remove_handler():
+        if PHYSICS_OT_projectile_draw_ghosts._handle is not None:
+            bpy.types.SpaceView3D.draw_handler_remove(PHYSICS_OT_projectile_draw_ghosts._handle, 'WINDOW')
+
+        PHYSICS_OT_projectile_draw_ghosts._handle = None
+
+    def execute(self, context):
+        return {'FINISHED'}
+
+
 def execute_all_poll(context):
-    objects = context.scene.objects
-    for ob in objects:
-        if ob.projectile_props.is_emitter and ob.projectile_props.is_dirty:
-            return True
-    return False
+    return bool(registry.EMITTERS.dirty_emitters(context.scene))
 
 
 class PHYSICS_PT_projectile(bpy.types.Panel):
@@ -77,6 +109,11 @@ class PHYSICS_PT_projectile(bpy.types.Panel):
         elif ob and ob.type in {'MESH'}:
             row = layout.row()
             row.operator('rigidbody.projectile_add_emitter', icon='ADD')
+
+            # Colliders are the rigid bodies in the scene
+            if ob.rigid_body:
+                row = layout.row()
+                row.prop(ob.projectile_props, 'collider_shape')
         else:
             row = layout.row()
             row.label(text="Select a mesh to create an emitter", icon="QUESTION")
@@ -92,8 +129,12 @@ class PHYSICS_PT_projectile(bpy.types.Panel):
             row = layout.row()
             row.prop(ob.projectile_props, 'start_hidden')
 
-            row = layout.row()
-            row.prop(ob.projectile_props, 'lifetime')
+            row = layout.row(align=True)
+            if ob.projectile_props.auto_lifetime:
+                row.prop(ob.projectile_props, 'settle_frames')
+            else:
+                row.prop(ob.projectile_props, 'lifetime')
+            row.prop(ob.projectile_props, 'auto_lifetime', text="", icon='AUTO')
 
             if settings.spherical:
                 col = layout.column(align=True)
@@ -107,8 +148,21 @@ class PHYSICS_PT_projectile(bpy.types.Panel):
             row = layout.row()
             row.prop(ob.projectile_props, 'w')
 
+            col = layout.column(align=True)
+            col.prop(ob.projectile_props, 'spread_angle')
+            col.prop(ob.projectile_props, 'speed_jitter')
+            col.prop(ob.projectile_props, 'angular_jitter')
+            col.prop(ob.projectile_props, 'seed')
+
+            col = layout.column(align=True)
+            col.prop(ob.projectile_props, 'emit_from')
+            if ob.projectile_props.emit_from != 'ORIGIN':
+                col.prop(ob.projectile_props, 'emit_source')
+                col.prop(ob.projectile_props, 'normal_speed')
+
             row = layout.row()
             row.operator('rigidbody.projectile_execute')
+            row.operator('rigidbody.projectile_previous_bake', text="", icon='LOOP_BACK')
 
             if execute_all_poll(context):
                 row = layout.row()
@@ -122,6 +176,22 @@ class PHYSICS_PT_projectile(bpy.types.Panel):
             row = layout.row()
             row.operator('rigidbody.projectile_execute_all')
 
+        if bake.is_baking():
+            row = layout.row()
+            row.label(text="Baking in background", icon='TIME')
+            row.operator('rigidbody.projectile_cancel_bake', text="", icon='CANCEL')
+        elif settings.cache_path:
+            row = layout.row()
+            row.label(text="Playing baked cache", icon='CHECKMARK')
+            row.operator('rigidbody.projectile_clear_bake', text="", icon='X')
+        elif bake.ERROR:
+            box = layout.box()
+            box.label(text=bake.ERROR, icon='ERROR')
+
+        row = layout.row(align=True)
+        row.operator('rigidbody.projectile_export_cache', icon='EXPORT')
+        row.operator('rigidbody.projectile_import_cache', icon='IMPORT')
+
 
 class PHYSICS_PT_projectile_rb_settings(bpy.types.Panel):
     bl_label = "Rigid Body Settings"
@@ -145,6 +215,35 @@ class PHYSICS_PT_projectile_rb_settings(bpy.types.Panel):
             row = layout.row()
             row.prop(ob.projectile_props, 'collision_shape')
 
+            col = layout.column(align=True)
+            col.active = ob.projectile_props.collision_shape in {'CONVEX_HULL', 'MESH'}
+            col.prop(ob.projectile_props, 'use_collision_proxy')
+            sub = col.column(align=True)
+            sub.active = ob.projectile_props.use_collision_proxy
+            sub.prop(ob.projectile_props, 'proxy_detail')
+
+            row = layout.row()
+            row.prop(ob.projectile_props, 'collision_group')
+
+            row = layout.row()
+            row.prop(ob.projectile_props, 'kill_volume')
+
+            row = layout.row()
+            row.prop(ob.projectile_props, 'use_deactivation')
+
+            col = layout.column(align=True)
+            col.active = ob.projectile_props.use_deactivation
+            col.prop(ob.projectile_props, 'deactivate_linear_velocity')
+            col.prop(ob.projectile_props, 'deactivate_angular_velocity')
+
+            row = layout.row()
+            row.prop(ob.projectile_props, 'use_drag')
+
+            col = layout.column(align=True)
+            col.active = ob.projectile_props.use_drag
+            col.prop(ob.projectile_props, 'linear_drag')
+            col.prop(ob.projectile_props, 'quadratic_drag')
+
 class PHYSICS_PT_projectile_settings(bpy.types.Panel):
     bl_label = "Projectile Settings"
     bl_parent_id = "PHYSICS_PT_projectile"
@@ -164,14 +263,68 @@ class PHYSICS_PT_projectile_settings(bpy.types.Panel):
         row = layout.row()
         row.prop(settings, "quality", expand=True)
 
+        row = layout.row()
+        row.prop(settings, 'background_bake')
+
+        row = layout.row()
+        row.prop(settings, 'share_instances')
+
         row = layout.row()
         row.prop(settings, 'draw_trajectories', expand=True)
 
+        row = layout.row()
+        row.active = settings.draw_trajectories != 'none'
+        row.prop(settings, 'spawn_trajectories')
+
+        row = layout.row()
+        row.active = settings.draw_trajectories != 'none'
+        row.prop(settings, 'preview_bounces')
+
+        row = layout.row()
+        row.prop(settings, 'ghost_preview')
+
+
+class PHYSICS_PT_projectile_profiling(bpy.types.Panel):
+    bl_label = "Profiling"
+    bl_parent_id = "PHYSICS_PT_projectile"
+    bl_category = "Physics"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        settings = context.scene.projectile_settings
+        profiler = profiling.PROFILER
+
+        row = layout.row()
+        row.prop(settings, 'profiling')
+        row.prop(settings, 'profile_python')
+
+        if profiler.timers:
+            col = layout.column(align=True)
+            for name, (total, calls) in sorted(profiler.timers.items()):
+                row = col.row()
+                row.label(text=name)
+                row.label(text=f"{total * 1000.0:.1f} ms / {calls}")
+
+        if profiler.counters:
+            col = layout.column(align=True)
+            for name, calls in sorted(profiler.counters.items()):
+                row = col.row()
+                row.label(text=name)
+                row.label(text=str(calls))
+
+        row = layout.row()
+        row.operator('rigidbody.projectile_reset_profile')
+        row.operator('rigidbody.projectile_export_profile', icon='EXPORT')
+
 
 classes = (
     PHYSICS_PT_projectile,
     PHYSICS_PT_projectile_rb_settings,
     PHYSICS_PT_projectile_settings,
+    PHYSICS_PT_projectile_profiling,
 )
 
 def register():
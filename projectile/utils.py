@@ -17,34 +17,56 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-import gpu
-from gpu_extras.batch import batch_for_shader
 import mathutils
 import math
+import numpy as np
 
+from . import colliders
+from . import preview
+from . import profiling
+from . import registry
 from . import ui
 
 
 def toggle_trajectory_drawing():
+    # There is no 3D view to draw in when running in the background
+    if bpy.app.background:
+        return
+
     if bpy.context.scene.projectile_settings.draw_trajectories in {'all', 'selected'}:
         ui.PHYSICS_OT_projectle_draw.add_handler()
     else:
         ui.PHYSICS_OT_projectle_draw.remove_handler()
 
+def toggle_ghost_preview():
+    # There is no 3D view to draw in when running in the background
+    if bpy.app.background:
+        return
+
+    if bpy.context.scene.projectile_settings.ghost_preview:
+        preview.add_handler()
+        ui.PHYSICS_OT_projectile_draw_ghosts.add_handler()
+    else:
+        preview.remove_handler()
+        ui.PHYSICS_OT_projectile_draw_ghosts.remove_handler()
+
 # Handler to run when UI property changes are made
 def ui_prop_change_handler(*args):
     if bpy.context.scene.projectile_settings.draw_trajectories:
-        draw_trajectory()
+        from . import draw
+        draw.draw_trajectory()
 
         # Tag View 3D to redraw if it is open
         for area in bpy.context.screen.areas:
             if area.type == 'VIEW_3D':
                 area.tag_redraw()
 
+    # Gravity and frame rate changes affect every cached trajectory
+    invalidate_trajectories()
+
     # For each emitter, set settings dirty
-    for ob in bpy.context.view_layer.objects:
-        if ob.projectile_props.is_emitter:
-            ob.projectile_props.is_dirty = True
+    for ob in registry.EMITTERS.emitters(bpy.context.scene):
+        ob.projectile_props.is_dirty = True
 
     # run operator for each projectile object
     # active = bpy.context.view_layer.objects.active
@@ -80,51 +102,6 @@ def get_projectile_collection():
 
     return bpy.context.scene.projectile_settings['projectile_collection']
 
-# Returns distance between two points in space
-def distance_between_points(origin, destination):
-    return math.sqrt(math.pow(destination.x - origin.x, 2) + math.pow(destination.y - origin.y, 2) + math.pow(destination.z - origin.z, 2))
-
-# Raycast from origin to destination (Defaults to (nearly) infinite distance)
-def raycast(context, origin, destination, distance=1.70141e+38):
-    direction = (destination - origin).normalized()
-    depsgraph = context.view_layer.depsgraph
-
-    cast = context.scene.ray_cast(depsgraph, origin, direction, distance=distance)
-    return cast
-
-# Kinematic Equation to find displacement over time
-# Used for drawing expected line
-def kinematic_displacement(initial, velocity, time):
-    frame_rate = bpy.context.scene.render.fps
-
-    if not bpy.context.scene.use_gravity:
-        gravity = mathutils.Vector((0.0, 0.0, 0.0))
-    else:
-        gravity = bpy.context.scene.gravity
-
-
-    dt = (time * 1.0) / frame_rate
-    ds = mathutils.Vector((0.0, 0.0, 0.0))
-
-    ds.x = initial.x + (velocity.x * dt) + (0.5 * gravity.x * math.pow(dt, 2))
-    ds.y = initial.y + (velocity.y * dt) + (0.5 * gravity.y * math.pow(dt, 2))
-    ds.z = initial.z + (velocity.z * dt) + (0.5 * gravity.z * math.pow(dt, 2))
-
-    return ds
-
-# Kinematic Equation to set angular velocity
-def kinematic_rotation(initial, angular_velocity, time):
-    frame_rate = bpy.context.scene.render.fps
-
-    dt = (time * 1.0) / frame_rate
-    dr = mathutils.Vector((0.0, 0.0, 0.0))
-
-    dr.x = initial.x + (angular_velocity.x * dt)
-    dr.y = initial.y + (angular_velocity.y * dt)
-    dr.z = initial.z + (angular_velocity.z * dt)
-
-    return dr
-
 # Convert spherical to cartesian coordinates
 def spherical_to_cartesian(radius, incline, azimuth):
     v = mathutils.Vector((0.0, 0.0, 0.0))
@@ -162,68 +139,567 @@ def is_emitter_instance(emitter, ob):
         return emitter_prop == emitter
     return False
 
-def calculate_trajectory(context, emitter):
-    s = emitter.location
+def scene_gravity(scene):
+    if not scene.use_gravity:
+        return (0.0, 0.0, 0.0)
+    return tuple(scene.gravity)
+
+# Velocity of a projectile after bouncing off a surface. The normal must face
+# against the incoming velocity. Friction removes tangential velocity in
+# proportion to the normal impulse (Coulomb friction).
+def bounce_velocity(velocity, normal, restitution, friction):
+    normal_velocity = normal * velocity.dot(normal)
+    tangent_velocity = velocity - normal_velocity
+
+    normal_impulse = (1.0 + restitution) * normal_velocity.length
+    tangent_speed = tangent_velocity.length
+    if tangent_speed > 0.0:
+        tangent_velocity *= max(0.0, 1.0 - friction * normal_impulse / tangent_speed)
+
+    return tangent_velocity - normal_velocity * restitution
+
+# Positions and velocities of a single projectile for each frame of its flight
+def flight(context, emitter, location, velocity, frames):
+    scene = context.scene
+    linear_drag, quadratic_drag = drag_coefficients(emitter)
+
+    positions, velocities = integrate_states(
+        np.array([location]), np.array([velocity]), frames, scene.render.fps, scene_gravity(scene),
+        linear_drag, quadratic_drag)
+
+    return positions[0], velocities[0]
+
+# First segment of a path (one point per frame) that hits a collider.
+# Returns the index of the segment and the cast, or None.
+def find_impact(context, emitter, points):
+    hit = colliders.COLLIDERS.find_impact(context, points)
+
+    if hit and not is_emitter_instance(emitter, hit[1][4]):
+        return hit
+
+    return None
+
+# One float32 array of line coordinates from a list of (n, 3) arrays
+def join_lines(lines):
+    if not lines:
+        return np.empty((0, 3), dtype=np.float32)
+    return np.concatenate(lines).astype(np.float32)
+
+# Trace the flight of a projectile through the scene colliders. At each hit the
+# path is reflected using the surface normal and the combined restitution and
+# friction of the emitter and collider, up to the preview bounce limit.
+# positions and velocities hold one row per frame of the first flight.
+# Returns an array of coordinate pairs to draw as lines.
+def trace_trajectory(context, emitter, positions, velocities):
+    props = emitter.projectile_props
+    bounces = context.scene.projectile_settings.preview_bounces
+
+    lines = []
+    for bounce in range(bounces + 1):
+        # Draw the path up to the first hit
+        hit = find_impact(context, emitter, positions)
+        end = hit[0] if hit else len(positions) - 1
+        lines.append(np.stack((positions[:end], positions[1:end + 1]), axis=1).reshape(-1, 3))
+
+        if hit:
+            lines.append(np.array((positions[hit[0]], tuple(hit[1][1]))))
+
+        if hit is None or bounce == bounces:
+            break
 
-    # Generate coordinates
-    cast = []
-    coordinates = []
-    v = kinematic_displacement(s, emitter.projectile_props.v, 0)
-    coord = mathutils.Vector((v.x, v.y, v.z))
-    coordinates.append(coord)
+        # Find the time and velocity of the impact within the segment
+        i, (_, location, normal, _, ob, _) = hit
+        segment = np.linalg.norm(positions[i + 1] - positions[i])
+        fraction = np.linalg.norm(np.array(tuple(location)) - positions[i]) / segment if segment else 0.0
+        velocity = mathutils.Vector(velocities[i] + (velocities[i + 1] - velocities[i]) * fraction)
 
-    for frame in range(1, context.scene.frame_end):
-        v = kinematic_displacement(s, emitter.projectile_props.v, frame)
-        coord = mathutils.Vector((v.x, v.y, v.z))
+        frames = int(len(positions) - 1 - (i + fraction))
+        if frames < 1:
+            break
 
-        # Get distance between previous and current position
-        distance = distance_between_points(coordinates[-1], coord)
+        # Face the normal against the incoming projectile
+        normal = normal.normalized()
+        if velocity.dot(normal) > 0.0:
+            normal.negate()
 
-        # Check if anything is in the way
-        cast = raycast(context, coordinates[-1], coord, distance)
+        # Bullet multiplies the restitution and friction of both bodies
+        restitution = props.bounciness
+        friction = props.friction
+        if ob.rigid_body:
+            restitution *= ob.rigid_body.restitution
+            friction *= ob.rigid_body.friction
 
-        # If so, set that position as final position
-        if cast[0] and not is_emitter_instance(emitter, cast[4]):
-            coordinates.append(cast[1])
+        velocity = bounce_velocity(velocity, normal, restitution, friction)
+        if velocity.length < 1e-3:
             break
 
-        coordinates.append(coord)
-        coordinates.append(coord)
+        # Start slightly off the surface to avoid hitting it again immediately
+        positions, velocities = flight(context, emitter, location + normal * 1e-4, velocity, frames)
+
+    return join_lines(lines)
+
+# Trajectories from the location of each emitter, integrated together
+def calculate_trajectories(context, emitters):
+    if not emitters:
+        return join_lines([])
+
+    scene = context.scene
+
+    # One row per launch point of each emitter
+    launches = [current_launches(emitter) for emitter in emitters]
+    owners = [emitter for emitter, (starts, _) in zip(emitters, launches) for _ in range(len(starts))]
+    if not owners:
+        return join_lines([])
+
+    starts = np.concatenate([starts for starts, _ in launches])
+    velocities = np.concatenate([velocities for _, velocities in launches])
+    linear_drag, quadratic_drag = np.array([drag_coefficients(emitter) for emitter in owners]).T
+
+    positions, velocities = integrate_states(
+        starts, velocities, scene.frame_end, scene.render.fps, scene_gravity(scene),
+        linear_drag, quadratic_drag)
+
+    return join_lines([trace_trajectory(context, emitter, positions[i], velocities[i])
+                       for i, emitter in enumerate(owners)])
+
+# Frames on which an emitter creates new instances
+def spawn_frames(props):
+    start = props.start_frame
+    end = props.end_frame
+    frames = end - start
+
+    number = min(frames, props.instance_count)
+    if number <= 0:
+        return []
+
+    step = frames / number
+
+    return [start + int(i * step) for i in range(number)]
+
+# Evaluate the local transform of an object at a frame from its F-Curves,
+# including delta transforms. Drivers and constraints are not evaluated.
+def evaluate_basis_matrix(ob, frame):
+    location = ob.location.copy()
+    rotation_euler = ob.rotation_euler.copy()
+    rotation_quaternion = ob.rotation_quaternion.copy()
+    rotation_axis_angle = list(ob.rotation_axis_angle)
+    scale = ob.scale.copy()
+
+    delta_location = ob.delta_location.copy()
+    delta_rotation_euler = ob.delta_rotation_euler.copy()
+    delta_rotation_quaternion = ob.delta_rotation_quaternion.copy()
+    delta_scale = ob.delta_scale.copy()
+
+    channels = {
+        'location': location,
+        'rotation_euler': rotation_euler,
+        'rotation_quaternion': rotation_quaternion,
+        'rotation_axis_angle': rotation_axis_angle,
+        'scale': scale,
+        'delta_location': delta_location,
+        'delta_rotation_euler': delta_rotation_euler,
+        'delta_rotation_quaternion': delta_rotation_quaternion,
+        'delta_scale': delta_scale,
+    }
+
+    if ob.animation_data and ob.animation_data.action:
+        for fcurve in ob.animation_data.action.fcurves:
+            channel = channels.get(fcurve.data_path)
+            if channel is not None and not fcurve.mute:
+                channel[fcurve.array_index] = fcurve.evaluate(frame)
+
+    # Deltas are applied before the regular rotation, as Blender does. There
+    # is no delta for axis angle rotations.
+    if ob.rotation_mode == 'QUATERNION':
+        rotation = delta_rotation_quaternion.normalized().to_matrix() @ rotation_quaternion.normalized().to_matrix()
+    elif ob.rotation_mode == 'AXIS_ANGLE':
+        rotation = mathutils.Matrix.Rotation(rotation_axis_angle[0], 3, rotation_axis_angle[1:])
+    else:
+        rotation_euler.order = ob.rotation_mode
+        delta_rotation_euler.order = ob.rotation_mode
+        rotation = delta_rotation_euler.to_matrix() @ rotation_euler.to_matrix()
+
+    scale = mathutils.Vector([s * d for s, d in zip(scale, delta_scale)])
+
+    return mathutils.Matrix.LocRotScale(location + delta_location, rotation, scale)
+
+# Evaluate the world matrix of an object at any frame without changing the
+# current scene frame (which is not allowed while drawing)
+def evaluate_world_matrix(ob, frame):
+    matrix = evaluate_basis_matrix(ob, frame)
+
+    if ob.parent:
+        matrix = evaluate_world_matrix(ob.parent, frame) @ ob.matrix_parent_inverse @ matrix
+
+    return matrix
+
+# Whether evaluate_world_matrix matches the depsgraph for an object. Constraints,
+# drivers, NLA strips and bone or vertex parents need a frame change instead.
+def transform_is_evaluable(ob):
+    while ob:
+        if ob.constraints or ob.parent_type != 'OBJECT':
+            return False
+
+        animation_data = ob.animation_data
+        if animation_data and (animation_data.drivers or animation_data.nla_tracks):
+            return False
+
+        ob = ob.parent
+
+    return True
+
+def frame_set(context, frame):
+    profiling.PROFILER.count('frame_set')
+    context.scene.frame_set(frame)
+
+# Launch velocities and angular velocities of count spawns, as two (count, 3)
+# arrays. Each velocity is tilted away from the emitter velocity by a random
+# angle within the spread cone and its speed scaled by the speed jitter, and
+# each angular velocity axis is offset by up to the angular jitter. All random
+# numbers come from one draw of the emitter's seed, so a bake is reproducible.
+def spread_velocities(props, count):
+    velocity = np.array(props.v, dtype=float)
+    angular_velocity = np.array(props.w, dtype=float)
+
+    samples = np.random.default_rng(props.seed).random((count, 6))
+
+    # Uniform directions on the spherical cap around the +Z axis
+    cos_tilt = 1.0 - samples[:, 0] * (1.0 - math.cos(props.spread_angle))
+    sin_tilt = np.sqrt(1.0 - cos_tilt ** 2)
+    turn = 2.0 * math.pi * samples[:, 1]
+    local = np.stack((sin_tilt * np.cos(turn), sin_tilt * np.sin(turn), cos_tilt), axis=1)
+
+    # Rotate the cap to face along the emitter velocity
+    speed = np.linalg.norm(velocity)
+    if speed:
+        axis = velocity / speed
+        helper = np.array((1.0, 0.0, 0.0)) if abs(axis[2]) > 0.9 else np.array((0.0, 0.0, 1.0))
+        tangent = np.cross(helper, axis)
+        tangent /= np.linalg.norm(tangent)
+        bitangent = np.cross(axis, tangent)
+
+        scale = speed * (1.0 + props.speed_jitter * (2.0 * samples[:, 2] - 1.0))
+        velocities = (local @ np.stack((tangent, bitangent, axis))) * scale[:, np.newaxis]
+    else:
+        velocities = np.zeros((count, 3))
+
+    angular_velocities = angular_velocity + props.angular_jitter * (2.0 * samples[:, 3:] - 1.0)
+
+    return velocities, angular_velocities
+
+# Object that carries the launch points of an emitter: the source mesh when
+# emitting from vertices or faces, otherwise the emitter itself
+def launch_object(emitter):
+    props = emitter.projectile_props
+    source = props.emit_source
+    if props.emit_from != 'ORIGIN' and source and source.type == 'MESH':
+        return source
+    return emitter
+
+# Local space launch points and normals of an emitter, as two (n, 3) arrays.
+# Emitting from the origin has a single point without a normal.
+def launch_points(emitter):
+    ob = launch_object(emitter)
+    if ob == emitter:
+        return np.zeros((1, 3)), np.zeros((1, 3))
+
+    mesh = ob.data
+    if emitter.projectile_props.emit_from == 'VERTS':
+        elements, attribute = mesh.vertices, 'co'
+    else:
+        elements, attribute = mesh.polygons, 'center'
+
+    points = np.empty(len(elements) * 3)
+    elements.foreach_get(attribute, points)
 
-    if not cast[0]:
-        v = kinematic_displacement(s, emitter.projectile_props.v, context.scene.frame_end)
-        coord = mathutils.Vector((v.x, v.y, v.z))
-        coordinates.append(coord)
+    normals = np.empty(len(elements) * 3)
+    elements.foreach_get('normal', normals)
 
-    return coordinates
+    return points.reshape(-1, 3), normals.reshape(-1, 3)
 
-SHADER = 'UNIFORM_COLOR' if bpy.app.version[0] >= 4 else '3D_UNIFORM_COLOR'
+# World space points and unit normals for a stack of (n, 4, 4) matrices, with
+# one row per matrix and point, ordered by matrix
+def world_points(matrices, points, normals):
+    locations = np.einsum('fij,pj->fpi', matrices[:, :3, :3], points) + matrices[:, np.newaxis, :3, 3]
 
-# Draws trajectories from all emitters
-def draw_trajectory():
-    context = bpy.context
-    data = bpy.data
-    draw_trajectories = context.scene.projectile_settings.draw_trajectories
+    # Normals transform by the inverse transpose
+    normals = np.einsum('fji,pj->fpi', np.linalg.pinv(matrices[:, :3, :3]), normals).reshape(-1, 3)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0.0)
+
+    return locations.reshape(-1, 3), normals
+
+# Launch state of every spawn of an emitter, given the world matrices of its
+# launch object on each spawn frame and on the frame before. There is one row
+# per frame and launch point, ordered by frame. Returns the launch frames,
+# locations, rotations, velocities and angular velocities.
+def launch_states(emitter, frames, frame_rate, matrices, previous):
+    props = emitter.projectile_props
+    points, local_normals = launch_points(emitter)
+
+    locations, normals = world_points(np.array([np.array(m) for m in matrices]), points, local_normals)
+    previous, _ = world_points(np.array([np.array(m) for m in previous]), points, local_normals)
+    rotations = np.repeat(np.array([tuple(m.to_euler()) for m in matrices]), len(points), axis=0)
+
+    # Instances inherit the velocity of their launch point
+    velocities, angular_velocities = spread_velocities(props, len(locations))
+    velocities = (locations - previous) * frame_rate + normals * props.normal_speed + velocities
+
+    return np.repeat(frames, len(points)), locations, rotations, velocities, angular_velocities
+
+# Launch states of the spawns of an emitter from F-Curve evaluation, without
+# changing the frame. This matches the launch states of plan.plan_spawns.
+def spawn_states(emitter, frames, frame_rate):
+    ob = launch_object(emitter)
+    matrices = [evaluate_world_matrix(ob, frame) for frame in frames]
+    previous = [evaluate_world_matrix(ob, frame - 1) for frame in frames]
 
-    if draw_trajectories == 'all':
-        emitters = [ob for ob in data.objects if ob.projectile_props.is_emitter]
+    return launch_states(emitter, frames, frame_rate, matrices, previous)
+
+# Launch locations and velocities of an emitter on the current frame, without
+# spread or inherited velocity
+def current_launches(emitter):
+    props = emitter.projectile_props
+    ob = launch_object(emitter)
+    if ob == emitter:
+        return np.array([emitter.location]), np.array([props.v])
+
+    points, normals = launch_points(emitter)
+    locations, normals = world_points(np.array([np.array(ob.matrix_world)]), points, normals)
+
+    return locations, np.array(props.v) + normals * props.normal_speed
+
+# Positions and velocities of many projectiles over many frames in a single
+# batch. starts and velocities are (n, 3) arrays, returns two (n, frames + 1, 3)
+# arrays.
+def kinematic_states(starts, velocities, frames, frame_rate, gravity):
+    t = (np.arange(frames + 1) / frame_rate)[np.newaxis, :, np.newaxis]
+    gravity = np.asarray(gravity)
+
+    positions = starts[:, np.newaxis, :] + velocities[:, np.newaxis, :] * t + 0.5 * gravity * t ** 2
+    velocities = velocities[:, np.newaxis, :] + gravity * t
+
+    return positions, velocities
+
+# Whether each point of an (n, 3) array lies inside the bounds of an object
+def inside_bounds(ob, points):
+    if ob.type == 'EMPTY':
+        size = ob.empty_display_size
+        low, high = np.full(3, -size), np.full(3, size)
     else:
-        # Only draw selected
-        emitters = [ob for ob in context.selected_objects if ob.projectile_props.is_emitter]
+        corners = np.array([tuple(corner) for corner in ob.bound_box])
+        low, high = corners.min(axis=0), corners.max(axis=0)
+
+    matrix = np.array(ob.matrix_world.inverted())
+    local = points @ matrix[:3, :3].T + matrix[:3, 3]
+
+    return np.all((local >= low) & (local <= high), axis=1)
+
+# Frames after launch until a projectile leaves the kill volume of its
+# emitter. The trajectory is followed up to the first collider it hits, after
+# which the projectile is assumed to come to rest. Returns None if the
+# projectile never leaves the volume or the emitter has none.
+def kill_volume_exit(context, emitter, location, velocity, frames):
+    volume = emitter.projectile_props.kill_volume
+    if not volume:
+        return None
+
+    positions, _ = flight(context, emitter, location, velocity, frames)
+
+    hit = find_impact(context, emitter, positions)
+    if hit:
+        positions = positions[:hit[0] + 1]
+
+    outside = np.flatnonzero(~inside_bounds(volume, positions))
+    if not len(outside):
+        return None
+
+    return int(outside[0])
+
+# Frames after launch until each of many projectiles first hits a collider,
+# flown in one batch from (n, 3) arrays of launch locations and velocities for
+# up to lengths[i] frames. Returns an (n,) array, -1 where nothing is hit.
+def impact_frames(context, emitter, locations, velocities, lengths):
+    impacts = np.full(len(locations), -1, dtype=np.int32)
+    if not len(locations):
+        return impacts
+
+    scene = context.scene
+    linear_drag, quadratic_drag = drag_coefficients(emitter)
+    positions, _ = integrate_states(
+        locations, velocities, int(max(lengths)), scene.render.fps, scene_gravity(scene),
+        linear_drag, quadratic_drag)
+
+    for i, length in enumerate(lengths):
+        hit = find_impact(context, emitter, positions[i, :length + 1])
+        if hit:
+            impacts[i] = hit[0] + 1
+
+    return impacts
+
+# Linear (per second) and quadratic (per meter) drag of an emitter's instances
+def drag_coefficients(emitter):
+    props = emitter.projectile_props
+    if not props.use_drag:
+        return 0.0, 0.0
+    return props.linear_drag, props.quadratic_drag
+
+# Acceleration from gravity and air drag for an (n, 3) array of velocities
+def drag_acceleration(velocities, gravity, linear_drag, quadratic_drag):
+    speed = np.linalg.norm(velocities, axis=1)
+    drag = linear_drag + quadratic_drag * speed
+
+    return gravity - drag[:, np.newaxis] * velocities
+
+# Number of RK4 steps taken per frame when integrating drag
+DRAG_SUBSTEPS = 4
+
+# Positions and velocities of many projectiles with air drag, advanced
+# together with a fixed step RK4 integrator. linear_drag and quadratic_drag
+# are scalars or (n,) arrays. Projectiles without drag use the exact
+# kinematic equations instead.
+def integrate_states(starts, velocities, frames, frame_rate, gravity, linear_drag, quadratic_drag):
+    count = len(starts)
+    linear_drag = np.broadcast_to(np.asarray(linear_drag, dtype=float), (count,))
+    quadratic_drag = np.broadcast_to(np.asarray(quadratic_drag, dtype=float), (count,))
+
+    if not linear_drag.any() and not quadratic_drag.any():
+        return kinematic_states(starts, velocities, frames, frame_rate, gravity)
+
+    gravity = np.asarray(gravity, dtype=float)
+    dt = 1.0 / (frame_rate * DRAG_SUBSTEPS)
+
+    def acceleration(v):
+        return drag_acceleration(v, gravity, linear_drag, quadratic_drag)
+
+    p = np.array(starts, dtype=float)
+    v = np.array(velocities, dtype=float)
+
+    positions = np.empty((count, frames + 1, 3))
+    out_velocities = np.empty((count, frames + 1, 3))
+    positions[:, 0] = p
+    out_velocities[:, 0] = v
+
+    for frame in range(1, frames + 1):
+        for _ in range(DRAG_SUBSTEPS):
+            a1 = acceleration(v)
+            v2 = v + 0.5 * dt * a1
+            a2 = acceleration(v2)
+            v3 = v + 0.5 * dt * a2
+            a3 = acceleration(v3)
+            v4 = v + dt * a3
+            a4 = acceleration(v4)
+
+            p = p + dt / 6.0 * (v + 2.0 * v2 + 2.0 * v3 + v4)
+            v = v + dt / 6.0 * (a1 + 2.0 * a2 + 2.0 * a3 + a4)
+
+        positions[:, frame] = p
+        out_velocities[:, frame] = v
+
+    return positions, out_velocities
+
+# Trajectories of spawned instances keyed by emitter name, then by spawn frame
+# and launch point. Each entry stores the launch state it was computed from so
+# only the spawns affected by an animation change are traced again.
+SPAWN_TRAJECTORIES = {}
+
+def invalidate_trajectories():
+    SPAWN_TRAJECTORIES.clear()
+    preview.invalidate()
+
+def invalidate_colliders():
+    colliders.COLLIDERS.invalidate()
+    invalidate_trajectories()
+
+def calculate_spawn_trajectories(context, emitter):
+    scene = context.scene
+    frame_rate = scene.render.fps
+    gravity = scene_gravity(scene)
+    props = emitter.projectile_props
+    scene_key = (frame_rate, gravity, scene.frame_end, scene.projectile_settings.preview_bounces)
+
+    frames = spawn_frames(props)
+    cache = SPAWN_TRAJECTORIES.setdefault(emitter.name, {})
+    if not frames:
+        cache.clear()
+        return join_lines([])
+
+    launch_frames, locations, _, launch_velocities, _ = spawn_states(emitter, frames, frame_rate)
+
+    # Spawns are identified by their frame and launch point
+    points = len(launch_frames) // len(frames)
+    spawns = [(frame, row % points) for row, frame in enumerate(launch_frames.tolist())]
+
+    # Find spawns whose launch state changed since they were last traced
+    stale = []
+    for spawn, location, velocity in zip(spawns, locations, launch_velocities):
+        key = (scene_key, tuple(location), tuple(velocity),
+               props.bounciness, props.friction, drag_coefficients(emitter))
+
+        if spawn not in cache or cache[spawn][0] != key:
+            stale.append((spawn, key, location, velocity))
+
+    # Forget spawns that no longer exist
+    for spawn in set(cache) - set(spawns):
+        del cache[spawn]
+
+    if stale:
+        starts = np.array([location for _, _, location, _ in stale])
+        velocities = np.array([velocity for _, _, _, velocity in stale])
+        length = max(1, max(scene.frame_end - frame for (frame, _), _, _, _ in stale))
+
+        linear_drag, quadratic_drag = drag_coefficients(emitter)
+        positions, velocities = integrate_states(
+            starts, velocities, length, frame_rate, gravity, linear_drag, quadratic_drag)
+
+        for i, (spawn, key, _, _) in enumerate(stale):
+            count = max(1, scene.frame_end - spawn[0])
+            cache[spawn] = (key, trace_trajectory(
+                context, emitter, positions[i, :count + 1], velocities[i, :count + 1]))
+
+    return join_lines([cache[spawn][1] for spawn in spawns])
+
+# Clear cached colliders and trajectories when anything they could collide
+# with changes
+def depsgraph_update_handler(scene, depsgraph):
+    for update in depsgraph.updates:
+        ob = update.id
+        if isinstance(ob, bpy.types.Collection):
+            invalidate_colliders()
+            return
+
+        if not isinstance(ob, bpy.types.Object):
+            continue
+
+        # Emitter animation changes where ghosts are launched from
+        if ob.projectile_props.is_emitter:
+            preview.invalidate(ob)
+            continue
 
-    # Generate a list of all coordinates for all trajectories
-    coordinates = []
-    for emitter in emitters:
-        coordinates += calculate_trajectory(context, emitter)
+        if "emitter" in ob.projectile_props:
+            continue
 
-    # Draw all trajectories
-    shader = gpu.shader.from_builtin(SHADER)
-    batch = batch_for_shader(shader, 'LINES', {"pos": coordinates})
+        if update.is_updated_transform or update.is_updated_geometry:
+            invalidate_colliders()
+            return
 
-    shader.bind()
-    shader.uniform_float("color", (1, 1, 1, 1))
+# Line coordinates of the trajectories of all (or the selected) emitters
+def trajectory_coordinates(context):
+    draw_trajectories = context.scene.projectile_settings.draw_trajectories
 
-    batch.draw(shader)
+    emitters = registry.EMITTERS.emitters(context.scene)
+    if draw_trajectories != 'all':
+        # Only draw selected
+        emitters = [ob for ob in emitters if ob.select_get()]
+
+    # Generate a list of all coordinates for all trajectories
+    with profiling.PROFILER.stage('trajectories'):
+        if context.scene.projectile_settings.spawn_trajectories:
+            coordinates = join_lines([calculate_spawn_trajectories(context, emitter) for emitter in emitters])
+        else:
+            coordinates = calculate_trajectories(context, emitters)
+
+    return coordinates
 
 # A global to determine if the property is set from the UI to avoid recursion
 FROM_UI = True
@@ -266,10 +742,149 @@ def spherical_callback(self, context):
         FROM_UI = True
         ob.projectile_props.v = spherical_to_cartesian(radius, incline, azimuth)
 
+# Number of rigid body collision collections
+COLLISION_LAYERS = 20
+
+# Collision collection shared by the environment and instances
+SHARED_LAYER = 0
+
+# Collision collection used by instances while they are kinematic at launch
+KINEMATIC_LAYER = 19
+
+# Collision collections that can be given to emitters
+GROUP_LAYERS = range(1, 19)
+
+# Assign collision collections to the emitters of a scene. Emitters that only
+# collide with their own instances get a collection each, and emitters that
+# only collide with the environment spread their instances over the remaining
+# ones. Environment colliders are added to every assigned collection. Emitters
+# whose collections changed since they were last allocated are marked dirty,
+# as their instances were keyframed on the old ones.
+# Returns a list of collection indices for each emitter name.
+def allocate_collision_layers(scene):
+    emitters = registry.EMITTERS.emitters(scene)
+    grouped = [ob for ob in emitters if ob.projectile_props.collision_group == 'EMITTER']
+
+    # Keep the collections of emitters that already have one so their
+    # existing instances stay valid
+    counts = {layer: 0 for layer in GROUP_LAYERS}
+    unassigned = []
+    for emitter in grouped:
+        layer = emitter.projectile_props.collision_layer
+        if layer in counts and not counts[layer]:
+            counts[layer] += 1
+        else:
+            unassigned.append(emitter)
+
+    # Share the least used collections once all are taken
+    for emitter in unassigned:
+        layer = min(GROUP_LAYERS, key=lambda layer: counts[layer])
+        emitter.projectile_props.collision_layer = layer
+        counts[layer] += 1
+
+    free = [layer for layer in GROUP_LAYERS if not counts[layer]] or list(GROUP_LAYERS)
+
+    allocation = {}
+    for emitter in emitters:
+        group = emitter.projectile_props.collision_group
+        if group == 'EMITTER':
+            allocation[emitter.name] = [emitter.projectile_props.collision_layer]
+        elif group == 'ENVIRONMENT':
+            allocation[emitter.name] = free
+        else:
+            allocation[emitter.name] = [SHARED_LAYER]
+
+    for emitter in emitters:
+        props = emitter.projectile_props
+        assigned = [layer in allocation[emitter.name] for layer in range(COLLISION_LAYERS)]
+        if list(props.collision_layers) != assigned:
+            # Emitters allocated before collections were recorded are kept
+            if any(props.collision_layers):
+                props.is_dirty = True
+            props.collision_layers = assigned
+
+    # Make sure the environment collides with every assigned collection
+    used = {layer for layers in allocation.values() for layer in layers}
+    for ob in colliders.collider_objects(scene):
+        collections = ob.rigid_body.collision_collections
+        if collections[SHARED_LAYER]:
+            for layer in used:
+                collections[layer] = True
+
+    return allocation
+
+# Fraction of the smallest object dimension a projectile may travel during a
+# single solver substep before it risks tunneling through a collider
+TUNNELING_FRACTION = 0.5
+
+# Blender limits the number of rigid body substeps per frame
+MAX_SUBSTEPS = 1000
+
+# Fastest speed an emitter's instances can reach: the launch speed plus the
+# speed gained falling for the instance lifetime, limited by terminal velocity
+def max_emitter_speed(context, emitter):
+    scene = context.scene
+    props = emitter.projectile_props
+    frame_rate = scene.render.fps
+
+    frames = spawn_frames(props)
+    if not frames:
+        return 0.0
+
+    _, _, _, launch_velocities, _ = spawn_states(emitter, frames, frame_rate)
+    launch_speed = np.linalg.norm(launch_velocities, axis=1).max(initial=0.0)
+
+    if props.lifetime and not props.auto_lifetime:
+        duration = props.lifetime / frame_rate
+    else:
+        duration = max(0, scene.frame_end - frames[0]) / frame_rate
+
+    gravity = mathutils.Vector(scene_gravity(scene)).length
+    fall_speed = gravity * duration
+
+    linear_drag, quadratic_drag = drag_coefficients(emitter)
+    if linear_drag:
+        fall_speed = min(fall_speed, gravity / linear_drag)
+    if quadratic_drag:
+        fall_speed = min(fall_speed, math.sqrt(gravity / quadratic_drag))
+
+    return launch_speed + fall_speed
+
+# Smallest nonzero dimension of the instances and colliders in the scene
+def min_collision_dimension(context, emitters):
+    objects = colliders.collider_objects(context.scene)
+    objects += [get_attr(emitter.projectile_props, "instance_object", None) for emitter in emitters]
+
+    dimensions = [d for ob in objects if ob for d in ob.dimensions if d > 0.0]
+
+    return min(dimensions, default=0.0)
+
+# Substeps per frame that keep the fastest projectile from moving further
+# than a fraction of the smallest object in a single substep
+def auto_substeps(context):
+    emitters = registry.EMITTERS.emitters(context.scene)
+
+    speed = max((max_emitter_speed(context, emitter) for emitter in emitters), default=0.0)
+    dimension = min_collision_dimension(context, emitters)
+    if not speed or not dimension:
+        return 1
+
+    steps_per_second = speed / (TUNNELING_FRACTION * dimension)
+    substeps = math.ceil(steps_per_second / context.scene.render.fps)
+
+    return max(1, min(substeps, MAX_SUBSTEPS))
+
 def set_quality(context):
+    with profiling.PROFILER.stage('set_quality'):
+        apply_quality(context)
+
+def apply_quality(context):
     frame_rate = context.scene.render.fps
     quality = context.scene.projectile_settings.quality
 
+    if not context.scene.rigidbody_world:
+        return
+
     if quality == 'very_low':
         context.scene.rigidbody_world.substeps_per_frame = frame_rate * 1
     elif quality == 'low':
@@ -278,5 +893,9 @@ def set_quality(context):
         context.scene.rigidbody_world.substeps_per_frame = frame_rate * 10
     elif quality == 'high':
         context.scene.rigidbody_world.substeps_per_frame = frame_rate * 20
+    elif quality == 'auto':
+        context.scene.rigidbody_world.substeps_per_frame = auto_substeps(context)
+        context.scene.rigidbody_world.solver_iterations = 10
+        return
 
     context.scene.rigidbody_world.solver_iterations = 20
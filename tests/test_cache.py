@@ -0,0 +1,88 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Transform cache playback, run against the bpy stand-in of the benchmarks
+#
+#   python -m unittest discover tests
+
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+
+import fakeblender
+
+bpy = fakeblender.install()
+
+import projectile
+from projectile import cache
+
+
+class ResumePlaybackTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        projectile.register()
+
+    @classmethod
+    def tearDownClass(cls):
+        projectile.unregister()
+
+    def setUp(self):
+        self.scene = fakeblender.new_file()
+        ob = bpy.data.objects.new("Ground", None)
+        self.scene.collection.objects.link(ob)
+        bpy.context.view_layer.objects.active = ob
+        bpy.ops.rigidbody.object_add()
+
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, "cache.npy")
+        records = cache.create_cache(self.path, 1, ["Ground"], 3)
+        cache.record_frames(self.scene, [ob], range(1, 4), records)
+        records.flush()
+        del records
+
+    def tearDown(self):
+        cache.stop_playback(self.scene)
+
+    def test_resume(self):
+        cache.start_playback(self.scene, self.path)
+        cache.resume_playback(self.scene)
+
+        self.assertIsNotNone(cache.PLAYBACK)
+        self.assertFalse(self.scene.rigidbody_world.enabled)
+
+    # A missing cache file must not leave the simulation disabled
+    def test_resume_missing_file(self):
+        cache.start_playback(self.scene, self.path)
+        os.remove(self.path)
+
+        cache.resume_playback(self.scene)
+
+        self.assertIsNone(cache.PLAYBACK)
+        self.assertTrue(self.scene.rigidbody_world.enabled)
+        self.assertEqual(self.scene.projectile_settings.cache_path, "")
+        self.assertNotIn(cache.frame_change_handler, bpy.app.handlers.frame_change_pre)
+
+
+if __name__ == "__main__":
+    unittest.main()